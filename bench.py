@@ -0,0 +1,362 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+import main
+
+# Sample winner names, including long ones that trigger font shrinking and line wrapping
+WINNER_NAMES = [
+    "Daigo", "Justin", "Tokido", "Infiltration", "Xian", "MenaRD",
+    "Punk", "Angry Bird", "Supercalifragilistic Expialidocious",
+    "TheLongestGamerTagInTheBracket", "Sonic Fox", "Chris G",
+]
+
+
+def generate_ranking_file(path, count, seed=0):
+    """
+    Write a synthetic ranking.txt with random winners and characters from the `renders` roster.
+
+    Args:
+        path (str): File to write.
+        count (int): Number of ranking lines.
+        seed (int): Random seed, so the same file is generated between commits.
+
+    Returns:
+        list: The generated lines.
+    """
+    rng = random.Random(seed)
+    roster = [name for name, entry in main.get_roster()["characters"].items() if name != "blank" and entry is not None]
+    solo = [name for name in ("ptx", "gold") if name in roster]
+
+    lines = []
+    for rank in range(1, count + 1):
+        winner_name = f"{rng.choice(WINNER_NAMES)} {rank}"
+        if solo and rng.random() < 0.1:
+            character1, character2 = rng.choice(solo), "blank"
+        else:
+            character1, character2 = rng.sample(roster, 2)
+        lines.append(f"{winner_name},{character1},{character2}\n")
+
+    with open(path, "w") as file:
+        file.writelines(lines)
+    return lines
+
+
+# Preview factors checked by --check-backends besides full size; 3 does not divide the card size
+CHECK_PREVIEWS = [2, 3]
+
+# Stages reported per call, in this order. png_save is timed here, the others by the profiling hooks of main.py
+STAGES = [
+    "get_character_images", "paste_light_blue_square", "paste_gradient_on_canvas", "paste_character_renders",
+    "draw_winner_info_on_canvas", "create_canvas", "png_save", "compile_images",
+]
+
+
+class StageTimer:
+    """
+    Collect wall times per stage.
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, stage, function, *args, **kwargs):
+        """
+        Call a function and record its wall time under the given stage.
+        """
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    def add_events(self, events, stages):
+        """
+        Record the calls of the given stages from trace events drained from main.py.
+        """
+        for event in events:
+            if event["name"] in stages:
+                self.samples.setdefault(event["name"], []).append(event["dur"] / 1e6)
+
+    def summary(self, order=()):
+        """
+        Summarize the recorded times.
+
+        Args:
+            order (list): Stages to list first, in this order.
+
+        Returns:
+            dict: Call count, total, mean, median and max time per stage.
+        """
+        return {
+            stage: {
+                "calls": len(times),
+                "total_s": sum(times),
+                "mean_ms": statistics.mean(times) * 1000,
+                "median_ms": statistics.median(times) * 1000,
+                "max_ms": max(times) * 1000,
+            }
+            for stage, times in sorted(self.samples.items(),
+                                       key=lambda item: order.index(item[0]) if item[0] in order else len(order))
+        }
+
+
+def render_card_staged(rank, line):
+    """
+    Render one card the way main.py does, once.
+
+    The stages are timed by main.py's profiling hooks inside this single render, so the
+    card is not built twice. The blue square and gradient are part of the cached card
+    layers, so they are only timed when those layers are built.
+
+    Args:
+        rank (int): The rank/position of the winner.
+        line (str): Line from the ranking file.
+
+    Returns:
+        Image: The card.
+    """
+    winner_name, character1, character2 = main.parse_ranking_line(line)
+    card_size = (main.fixed_width // 2, main.fixed_height)
+    char1_image, char2_image = main.get_character_images(character1, character2, main.fixed_width,
+                                                         main.fixed_height, card_size=card_size)
+    return main.create_canvas(char1_image, char2_image, winner_name, rank)
+
+
+def run_size(count, seed=0, repeat=1):
+    """
+    Benchmark rendering a synthetic ranking of the given size.
+
+    Args:
+        count (int): Number of ranking lines (at least 8 for the composite).
+        seed (int): Random seed for the synthetic ranking.
+        repeat (int): Number of times the whole ranking is rendered.
+
+    Returns:
+        dict: Stage timings, totals and peak RSS for this size.
+    """
+    # Keep renders in memory only so runs do not depend on an earlier run's disk cache
+    main.render_cache_dir = None
+    timer = StageTimer()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        lines = generate_ranking_file(os.path.join(output_dir, "ranking.txt"), count, seed)
+        main.profiling_enabled = True
+        main.drain_profile()
+        start = time.perf_counter()
+        # Silence the per-card progress output of main.py
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                top_cards = []
+                for rank, line in enumerate(lines, 1):
+                    canvas = render_card_staged(rank, line)
+                    buffer = io.BytesIO()
+                    timer.measure("png_save", canvas.save, buffer, format="PNG")
+                    if rank <= main.COMPOSITE_RANKS:
+                        top_cards.append(canvas)
+                main.compile_images(output_dir, images=top_cards)
+        elapsed = time.perf_counter() - start
+        main.profiling_enabled = False
+        timer.add_events(main.drain_profile()["events"], STAGES)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    return {
+        "lines": count,
+        "repeat": repeat,
+        "total_s": elapsed,
+        "cards_per_s": count * repeat / elapsed,
+        "peak_rss_mb": peak_rss / (1024 * 1024),
+        "stages": timer.summary(STAGES),
+    }
+
+
+def run_benchmarks(sizes, seed=0, repeat=1):
+    """
+    Benchmark every size in a fresh process so peak RSS is measured per size.
+
+    Args:
+        sizes (list): Ranking sizes to benchmark.
+        seed (int): Random seed for the synthetic rankings.
+        repeat (int): Number of times each ranking is rendered.
+
+    Returns:
+        dict: Results with environment information, keyed by size.
+    """
+    results = {}
+    for count in sizes:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results[str(count)] = pool.submit(run_size, count, seed, repeat).result()
+    return {
+        "python": platform.python_version(),
+        "pillow": Image.__version__,
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Compare two benchmark results and list the stages that regressed.
+
+    Args:
+        baseline (dict): Earlier benchmark results.
+        current (dict): New benchmark results.
+        threshold (float): Allowed relative slowdown of a stage's mean time, e.g. 0.1 for 10%.
+
+    Returns:
+        list: Descriptions of the regressions, empty if there are none.
+    """
+    regressions = []
+    for size, result in current["results"].items():
+        previous = baseline["results"].get(size)
+        if previous is None:
+            continue
+        for stage, stats in result["stages"].items():
+            before = previous["stages"].get(stage)
+            if before is None or before["mean_ms"] == 0:
+                continue
+            change = stats["mean_ms"] / before["mean_ms"] - 1
+            if change > threshold:
+                regressions.append(f"{size} lines, {stage}: {before['mean_ms']:.2f} ms -> {stats['mean_ms']:.2f} ms (+{change:.0%})")
+        before_rss, after_rss = previous["peak_rss_mb"], result["peak_rss_mb"]
+        if before_rss and after_rss / before_rss - 1 > threshold:
+            regressions.append(f"{size} lines, peak RSS: {before_rss:.1f} MB -> {after_rss:.1f} MB")
+    return regressions
+
+
+def compare_backends(count, seed=0, preview=1):
+    """
+    Render a synthetic ranking with both compositing backends and compare the cards pixel by pixel.
+
+    Args:
+        count (int): Number of ranking lines.
+        seed (int): Random seed for the synthetic ranking.
+        preview (int): Preview factor the cards are drawn at, 1 for full size.
+
+    Returns:
+        dict: Seconds spent building the cards per backend and the ranks whose cards differ.
+    """
+    main.render_cache_dir = None
+    main.preview_factor = preview
+    with tempfile.TemporaryDirectory() as output_dir:
+        lines = generate_ranking_file(os.path.join(output_dir, "ranking.txt"), count, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cards = [main.load_card(rank, *main.parse_ranking_line(line)) for rank, line in enumerate(lines, 1)]
+    # Build the shared layers first so neither backend is timed with them
+    main.get_card_layers(main.fixed_width, main.fixed_height, preview)
+
+    start = time.perf_counter()
+    expected = [main.create_canvas(*card) for card in cards]
+    pillow_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = []
+    for first in range(0, len(cards), main.NUMPY_BATCH_SIZE):
+        batched.extend(main.create_canvas_batch(cards[first:first + main.NUMPY_BATCH_SIZE]))
+    numpy_s = time.perf_counter() - start
+
+    different = [rank for rank, (card, other) in enumerate(zip(expected, batched), 1)
+                 if card.mode != other.mode or card.size != other.size or card.tobytes() != other.tobytes()]
+    main.preview_factor = 1
+    return {"pillow_s": pillow_s, "numpy_s": numpy_s, "different": different}
+
+
+def print_results(results):
+    """
+    Print a table of stage timings for every benchmarked size.
+    """
+    for size, result in results["results"].items():
+        print(f"\n{size} lines: {result['total_s']:.2f} s, {result['cards_per_s']:.1f} cards/s, "
+              f"peak RSS {result['peak_rss_mb']:.1f} MB")
+        print(f"  {'stage':<28}{'calls':>7}{'mean ms':>10}{'median ms':>11}{'max ms':>9}")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<28}{stats['calls']:>7}{stats['mean_ms']:>10.2f}{stats['median_ms']:>11.2f}{stats['max_ms']:>9.2f}")
+
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the card and composite pipeline on synthetic rankings.")
+    parser.add_argument("--sizes", default="8,64,1000",
+                        help="Comma separated numbers of ranking lines to benchmark (default 8,64,1000).")
+    parser.add_argument("--repeat", type=int, default=1, help="Render each ranking this many times.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic rankings.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", help="Earlier JSON results to check for regressions.")
+    parser.add_argument("--check-backends", action="store_true",
+                        help="Check that the Pillow and NumPy backends build identical cards instead of benchmarking.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Allowed relative slowdown before a stage counts as a regression (default 0.1).")
+    return parser.parse_args(argv)
+
+
+def main_bench(argv=None):
+    """
+    Run the benchmarks, optionally saving them and comparing them to earlier results.
+
+    Returns:
+        int: Exit status, 1 if a regression was found.
+    """
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if min(sizes) < main.COMPOSITE_RANKS:
+        print(f"Sizes must be at least {main.COMPOSITE_RANKS} to build the composite")
+        return 2
+
+    if args.check_backends:
+        if main.np is None:
+            print("The NumPy backend needs NumPy installed")
+            return 2
+        status = 0
+        for count in sizes:
+            for preview in [1] + CHECK_PREVIEWS:
+                result = compare_backends(count, seed=args.seed, preview=preview)
+                label = f"{count} lines" + (f", preview {preview}" if preview > 1 else "")
+                print(f"{label}: pillow {result['pillow_s']:.2f} s, numpy {result['numpy_s']:.2f} s "
+                      f"({result['pillow_s'] / result['numpy_s']:.1f}x)")
+                if result["different"]:
+                    print(f"  {len(result['different'])} cards differ, ranks {result['different'][:20]}")
+                    status = 1
+        print("Backends differ" if status else "Backends identical")
+        return status
+
+    results = run_benchmarks(sizes, seed=args.seed, repeat=args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} compared to {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
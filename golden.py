@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+from PIL import Image, ImageChops, ImageStat
+
+import main
+
+# Folder holding the golden images and their metadata
+GOLDEN_DIR = "golden_images"
+GOLDEN_INDEX = "golden.json"
+
+# Fixed ranking covering the special cases of the card layout
+FIXTURES = [
+    "Daigo, ryu, ken",
+    "Justin Wong, chun, morrigan",
+    # Solo ptx and gold are swapped behind a blank render, whatever their case
+    "Gold Guy, PTX, blank",
+    # Too wide even at the minimum font size, so the name is wrapped onto two lines
+    "Supercalifragilistic Expialidocious Champion, zero, roll",
+    # Too wide without a space to wrap at
+    "TheLongestGamerTagInTheBracket, casshan, karas",
+    "Medalist, gold, blank",
+    # Wide enough to shrink the font without wrapping
+    "Infiltration Wins, saki, soki",
+    "x, cjoe, vjoe",
+    "Tokido, tekkaman, yatter1",
+    # Two digit rank number
+    "Punk, volnutt, frank",
+]
+
+
+def render_fixtures(backend="pillow"):
+    """
+    Render the fixture cards and the composite of the top ranks.
+
+    Args:
+        backend (str): Compositing backend for the cards, "pillow" or "numpy".
+
+    Returns:
+        tuple: (images, timings) where images maps fixture names ("card_1" ... and "composite")
+        to images and timings maps them to the time spent rendering them in milliseconds.
+    """
+    images = {}
+    timings = {}
+    # Silence the per-card progress output of main.py
+    with contextlib.redirect_stdout(io.StringIO()):
+        if backend == "numpy":
+            start = time.perf_counter()
+            cards = [main.load_card(rank, *main.parse_ranking_line(line)) for rank, line in enumerate(FIXTURES, 1)]
+            canvases = main.create_canvas_batch(cards)
+            # The batch is built at once, so every card gets an equal share of its time
+            share = (time.perf_counter() - start) * 1000 / len(canvases)
+            for rank, canvas in enumerate(canvases, 1):
+                images[f"card_{rank}"] = canvas
+                timings[f"card_{rank}"] = share
+        else:
+            for rank, line in enumerate(FIXTURES, 1):
+                start = time.perf_counter()
+                images[f"card_{rank}"] = main.render_card(rank, *main.parse_ranking_line(line))
+                timings[f"card_{rank}"] = (time.perf_counter() - start) * 1000
+
+        count = min(main.COMPOSITE_RANKS, len(FIXTURES))
+        start = time.perf_counter()
+        images["composite"] = main.create_composite([images[f"card_{rank}"] for rank in range(1, count + 1)],
+                                                    count, main.COMPOSITE_SIZE)
+        timings["composite"] = (time.perf_counter() - start) * 1000
+    return images, timings
+
+
+def render_best_of(repeat, backend="pillow"):
+    """
+    Render the fixtures several times and keep the fastest time of each.
+
+    The first round also builds the shared layers and loads the renders, so with a repeat
+    above 1 the timings are those of a warm process.
+
+    Args:
+        repeat (int): Number of rounds.
+        backend (str): Compositing backend for the cards.
+
+    Returns:
+        tuple: (images, timings) of the last round, with the fastest time per fixture.
+    """
+    best = {}
+    for _ in range(repeat):
+        images, timings = render_fixtures(backend)
+        for name, milliseconds in timings.items():
+            best[name] = min(best.get(name, milliseconds), milliseconds)
+    return images, best
+
+
+def image_digest(image):
+    """
+    Hash the mode, size and pixels of an image, independently of how it was encoded.
+    """
+    digest = hashlib.sha1(f"{image.mode} {image.width}x{image.height}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def compare_images(expected, actual, tolerance=0, max_pixels=0.0):
+    """
+    Compare an image with its golden image.
+
+    Args:
+        expected (Image): Golden image.
+        actual (Image): Freshly rendered image.
+        tolerance (int): Largest difference of a channel value that still counts as equal.
+        max_pixels (float): Fraction of pixels allowed to differ by more than the tolerance.
+
+    Returns:
+        dict: Whether it passed, the largest and mean channel difference and the fraction of
+        pixels beyond the tolerance.
+    """
+    if expected.size != actual.size or expected.mode != actual.mode:
+        return {"passed": False, "reason": f"{actual.mode} {actual.size} instead of {expected.mode} {expected.size}"}
+    if expected.tobytes() == actual.tobytes():
+        return {"passed": True, "identical": True, "max_difference": 0, "mean_difference": 0.0, "differing": 0.0}
+
+    difference = ImageChops.difference(expected, actual)
+    bands = difference.split()
+    max_difference = max(band.getextrema()[1] for band in bands)
+    mean_difference = sum(ImageStat.Stat(difference).mean) / len(bands)
+    # A pixel differs when any of its channels is beyond the tolerance
+    beyond = [band.point(lambda value: 255 if value > tolerance else 0) for band in bands]
+    mask = beyond[0]
+    for band in beyond[1:]:
+        mask = ImageChops.lighter(mask, band)
+    differing = mask.histogram()[255] / (expected.width * expected.height)
+    return {
+        "passed": differing <= max_pixels,
+        "identical": False,
+        "max_difference": max_difference,
+        "mean_difference": mean_difference,
+        "differing": differing,
+    }
+
+
+def update_goldens(golden_dir, images, timings):
+    """
+    Store the rendered images as the new golden images, with their timings as the baseline.
+
+    Args:
+        golden_dir (str): Folder for the golden images.
+        images (dict): Rendered images by fixture name.
+        timings (dict): Render times in milliseconds by fixture name.
+    """
+    os.makedirs(golden_dir, exist_ok=True)
+    index = {
+        "python": platform.python_version(),
+        "pillow": Image.__version__,
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fixtures": {},
+    }
+    for name, image in images.items():
+        image.save(os.path.join(golden_dir, f"{name}.png"))
+        index["fixtures"][name] = {"file": f"{name}.png", "sha1": image_digest(image), "ms": timings[name]}
+    with open(os.path.join(golden_dir, GOLDEN_INDEX), "w") as file:
+        json.dump(index, file, indent=2)
+
+
+def check_goldens(golden_dir, images, timings, tolerance=0, max_pixels=0.0, failures_dir=None):
+    """
+    Compare the rendered images with the golden images.
+
+    Args:
+        golden_dir (str): Folder with the golden images.
+        images (dict): Rendered images by fixture name.
+        timings (dict): Render times in milliseconds by fixture name.
+        tolerance (int): Largest difference of a channel value that still counts as equal.
+        max_pixels (float): Fraction of pixels allowed to differ by more than the tolerance.
+        failures_dir (str): If given, save the rendered image and a difference image of every failure here.
+
+    Returns:
+        dict: Comparison and timing against the baseline, by fixture name.
+    """
+    with open(os.path.join(golden_dir, GOLDEN_INDEX), "r") as file:
+        index = json.load(file)
+    if index["pillow"] != Image.__version__:
+        print(f"Golden images were made with Pillow {index['pillow']}, this is Pillow {Image.__version__}; "
+              f"text rendering may differ slightly")
+
+    results = {}
+    for name, image in images.items():
+        entry = index["fixtures"].get(name)
+        if entry is None:
+            results[name] = {"passed": False, "reason": "no golden image, run with --update"}
+            continue
+        golden = None
+        if image_digest(image) == entry["sha1"]:
+            # Same pixels as when the golden image was stored, no need to decode it
+            result = {"passed": True, "identical": True, "max_difference": 0, "mean_difference": 0.0, "differing": 0.0}
+        else:
+            with Image.open(os.path.join(golden_dir, entry["file"])) as golden:
+                golden.load()
+            result = compare_images(golden, image, tolerance, max_pixels)
+        result["ms"] = timings[name]
+        result["baseline_ms"] = entry["ms"]
+        result["speedup"] = entry["ms"] / timings[name] if timings[name] else None
+        results[name] = result
+
+        if failures_dir and not result["passed"]:
+            os.makedirs(failures_dir, exist_ok=True)
+            image.save(os.path.join(failures_dir, f"{name}.png"))
+            if golden is not None and golden.size == image.size and golden.mode == image.mode:
+                ImageChops.difference(golden, image).convert("RGB").save(os.path.join(failures_dir, f"{name}_diff.png"))
+    return results
+
+
+def print_results(results):
+    """
+    Print a table of the comparisons with the render time of each fixture next to its baseline.
+    """
+    print(f"{'fixture':<12}{'result':>10}{'max diff':>10}{'mean diff':>11}{'differing':>11}"
+          f"{'ms':>9}{'baseline':>10}{'speedup':>9}")
+    for name, result in results.items():
+        if "reason" in result:
+            print(f"{name:<12}{'FAIL':>10}  {result['reason']}")
+            continue
+        status = "identical" if result["identical"] else "ok" if result["passed"] else "FAIL"
+        print(f"{name:<12}{status:>10}{result['max_difference']:>10}{result['mean_difference']:>11.3f}"
+              f"{result['differing']:>11.4%}{result['ms']:>9.1f}{result['baseline_ms']:>10.1f}"
+              f"{result['speedup']:>8.2f}x")
+    timed = [result for result in results.values() if "ms" in result]
+    if timed:
+        total, baseline = sum(result["ms"] for result in timed), sum(result["baseline_ms"] for result in timed)
+        print(f"{'total':<12}{'':>52}{total:>9.1f}{baseline:>10.1f}{baseline / total:>8.2f}x")
+
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Render fixed ranking fixtures and compare them with golden images.")
+    parser.add_argument("--update", action="store_true",
+                        help="Store the current output as the golden images and timing baseline.")
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR, help=f"Folder of the golden images (default {GOLDEN_DIR}).")
+    parser.add_argument("--tolerance", type=int, default=0,
+                        help="Largest channel difference (0-255) that still counts as equal (default 0, exact).")
+    parser.add_argument("--max-pixels", type=float, default=0.0,
+                        help="Fraction of pixels that may differ by more than the tolerance (default 0).")
+    parser.add_argument("--backend", choices=main.COMPOSITING_BACKENDS, default="pillow",
+                        help="Compositing backend used for the cards (default pillow).")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Render the fixtures this many times and keep the fastest time (default 3).")
+    parser.add_argument("--failures", metavar="DIR", help="Save the rendered and difference images of failures here.")
+    parser.add_argument("--output", help="Write the comparison results as JSON to this file.")
+    args = parser.parse_args(argv)
+    if args.backend == "numpy" and main.np is None:
+        parser.error("--backend numpy needs NumPy installed")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    return args
+
+
+def main_golden(argv=None):
+    """
+    Render the fixtures, then either store them as golden images or compare them with the stored ones.
+
+    Returns:
+        int: Exit status, 1 if an image does not match and 2 if there are no golden images.
+    """
+    args = parse_args(argv)
+    # Keep renders in memory only so the result does not depend on an earlier run's disk cache
+    main.render_cache_dir = None
+    images, timings = render_best_of(args.repeat, args.backend)
+
+    if args.update:
+        update_goldens(args.golden_dir, images, timings)
+        print(f"Stored {len(images)} golden images in {args.golden_dir}")
+        return 0
+
+    if not os.path.exists(os.path.join(args.golden_dir, GOLDEN_INDEX)):
+        print(f"No golden images in {args.golden_dir}, run with --update first")
+        return 2
+    results = check_goldens(args.golden_dir, images, timings, args.tolerance, args.max_pixels, args.failures)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    failed = [name for name, result in results.items() if not result["passed"]]
+    if failed:
+        print(f"\n{len(failed)} of {len(results)} images do not match: {', '.join(failed)}")
+        return 1
+    print(f"\nAll {len(results)} images match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_golden())
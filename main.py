@@ -1,18 +1,384 @@
+import argparse
+import difflib
+import functools
+import hashlib
+import itertools
+import json
+import mmap
 import os
+import queue
 import shutil
-from PIL import Image, ImageDraw, ImageFont
+import sys
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import OrderedDict, deque
+from PIL import GifImagePlugin, Image, ImageChops, ImageColor, ImageDraw, ImageFont
 from PIL import ImageOps
 
+try:
+    import numpy as np
+except ImportError:  # Only needed by the NumPy compositing backend
+    np = None
+
 # Path to the RussoOne-Regular font file
 GENERAL_FONT_PATH = "./font/RussoOne-Regular.ttf"
 
+
+@functools.lru_cache(maxsize=None)
+def get_font(size, path=GENERAL_FONT_PATH):
+    """
+    Load a font at the given size once and reuse it.
+    
+    Args:
+        size (int): Font size.
+        path (str): Path to the font file.
+        
+    Returns:
+        ImageFont.FreeTypeFont: Shared font object.
+    """
+    return ImageFont.truetype(path, size)
+
+
 # Load different font sizes for versatility
-general_font_small = ImageFont.truetype(GENERAL_FONT_PATH, 60)
-general_font_large = ImageFont.truetype(GENERAL_FONT_PATH, 80)
+general_font_small = get_font(60)
+general_font_large = get_font(80)
 
 fixed_width = 500 
 fixed_height = 500
 
+LOGO_PATH = "logo/logo.png"
+RENDERS_DIR = "renders"
+CACHE_DIR = ".cache"
+
+# Style parameters of the static card layers (part of the background cache key)
+LOGO_OPACITY = 0.5
+CARD_CORNER_RADIUS = 30
+
+# Define pastel rainbow colors
+PASTEL_RAINBOW = (
+    (255, 102, 102),      # Pastel Red
+    (255, 178, 102),     # Pastel Orange
+    (255, 255, 102),     # Pastel Yellow
+    (178, 255, 102),     # Pastel Green
+    (102, 178, 255),     # Pastel Blue
+    (178, 102, 255),     # Pastel Indigo
+    (255, 102, 178)      # Pastel Violet
+)
+
+# Colors of the card's diagonal gradient, can be replaced per event
+gradient_palette = PASTEL_RAINBOW
+
+# Directory to persist background layers in, or None to keep them in memory only
+background_cache_dir = None
+
+# Directory for pre-resized character renders, or None to keep them in memory only
+render_cache_dir = os.path.join(CACHE_DIR, "renders")
+
+# Number of rotated gradient and square layers kept in memory
+GRADIENT_CACHE_SIZE = 16
+
+# Number of measured and rasterized strings kept in memory
+TEXT_CACHE_SIZE = 256
+
+# Number of resized logo variants and character renders kept in memory
+LOGO_CACHE_SIZE = 8
+RENDER_CACHE_SIZE = 64
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Number of top ranks shown in the composite image by default, and the default composite size
+COMPOSITE_RANKS = 8
+COMPOSITE_SIZE = (1920, 1080)
+
+# Share of the composite height used by the top 8 tiers when there are more than 8 cards
+COMPOSITE_TIERS_FRACTION = 0.6
+
+# Composite settings, changed with --top, --composite-size and --memory-budget
+composite_ranks = COMPOSITE_RANKS
+composite_size = COMPOSITE_SIZE
+# Other composite sizes written next to it, e.g. ((1920, 1080), (480, 270))
+composite_pyramid = ()
+composite_memory_budget = None
+
+# Timing of the reveal animation, and the file or folder it is saved as per format
+REVEAL_FPS = 30
+REVEAL_SLIDE_SECONDS = 0.5
+REVEAL_PAUSE_SECONDS = 0.5
+REVEAL_FINAL_SECONDS = 3
+REVEAL_FORMATS = {"apng": "reveal.png", "gif": "reveal.gif", "frames": "reveal"}
+
+# Reveal settings, changed with --reveal and --reveal-fps
+reveal_format = None
+reveal_fps = REVEAL_FPS
+
+# Cards and the composite are drawn at 1/preview_factor of their size with --preview, 1 is final quality
+preview_factor = 1
+
+# Index of the character renders kept between runs, or None to rebuild it in every process
+roster_index_path = os.path.join(CACHE_DIR, "roster.json")
+_roster = None
+
+# Packed atlas of the trimmed character renders, built with --atlas build, or None to always decode the PNGs
+atlas_path = os.path.join(CACHE_DIR, "atlas.bin")
+ATLAS_MAGIC = b"RNDRATL1"
+# Modes whose bands are one byte per pixel each, so `len(mode)` is the bytes per pixel
+ATLAS_MODES = ("RGBA", "RGB", "LA", "L")
+_atlas = None
+
+# Output file formats: Pillow format name and file extension
+OUTPUT_FORMATS = {"png": ("PNG", ".png"), "webp": ("WEBP", ".webp"), "qoi": ("QOI", ".qoi")}
+
+# Encoder options per format, from the fastest tier to the one with the smallest files.
+# WebP is always lossless, and exact keeps the color of fully transparent pixels like PNG does
+ENCODE_TIERS = {
+    "png": {"fast": {"compress_level": 1}, "default": {}, "small": {"compress_level": 9, "optimize": True}},
+    "webp": {"fast": {"lossless": True, "exact": True, "method": 0},
+             "default": {"lossless": True, "exact": True},
+             "small": {"lossless": True, "exact": True, "method": 6, "quality": 100}},
+    "qoi": {"fast": {}, "default": {}, "small": {}},
+}
+
+# Output settings, changed with --format, --encode-tier, --compress-level, --optimize and --encode-threads
+output_format = "png"
+output_options = {}
+encode_threads = 1
+
+# Card compositing backends; "numpy" builds NUMPY_BATCH_SIZE cards at a time in one array
+COMPOSITING_BACKENDS = ("pillow", "numpy")
+NUMPY_BATCH_SIZE = 32
+compositing_backend = "pillow"
+
+# Cards whose renders are decoded ahead of the card being composed in a serial run
+PIPELINE_DEPTH = 4
+
+_card_layer_cache = {}
+_file_digest_cache = {}
+_decoded_asset_cache = {}
+_logo_cache = OrderedDict()
+_render_cache = OrderedDict()
+
+# Drawing context used only to measure text
+_measure_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+
+# Guards the caches above when cards are rendered on a thread pool
+_cache_lock = threading.RLock()
+
+
+def synchronized(function):
+    """
+    Serialize calls to a cache accessor so worker threads can share its cache.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with _cache_lock:
+            return function(*args, **kwargs)
+    return wrapper
+
+
+# Profiling state, stage timings are only recorded when enabled with --profile or --trace
+profiling_enabled = False
+_worker_process = False
+_profile_lock = threading.Lock()
+_profile_stages = {}
+_profile_counters = {}
+_trace_events = []
+
+
+def profile_count(name, amount=1):
+    """
+    Add to a profiling counter such as bytes decoded, resizes or cache hits.
+    
+    Args:
+        name (str): Counter name.
+        amount (int): Amount to add.
+    """
+    with _profile_lock:
+        _profile_counters[name] = _profile_counters.get(name, 0) + amount
+
+
+def profiled(function):
+    """
+    Record the wall and CPU time of every call to a pipeline stage while profiling is enabled.
+    """
+    name = function.__name__
+    
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not profiling_enabled:
+            return function(*args, **kwargs)
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            with _profile_lock:
+                stage = _profile_stages.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+                stage["calls"] += 1
+                stage["wall"] += wall
+                stage["cpu"] += cpu
+                _trace_events.append({
+                    "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                    "ts": start_wall * 1e6, "dur": wall * 1e6, "args": {"cpu_ms": cpu * 1000},
+                })
+    return wrapper
+
+
+def _lru_cache_counters():
+    counters = {}
+    for label, function in (("font cache", get_font), ("text measure cache", measure_text),
+                            ("text mask cache", get_text_mask), ("gradient cache", get_rotated_layer)):
+        info = function.cache_info()
+        counters[f"{label} hits"] = info.hits
+        counters[f"{label} misses"] = info.misses
+    return counters
+
+
+_drained_lru_counters = {}
+
+
+def drain_profile():
+    """
+    Take the profiling data recorded so far and reset it, e.g. to send it from a worker process.
+    
+    Returns:
+        dict: Stage timings, counters (including new hits on the memoized caches) and trace events.
+    """
+    global _profile_stages, _profile_counters, _trace_events, _drained_lru_counters
+    lru_counters = _lru_cache_counters()
+    with _profile_lock:
+        snapshot = {"stages": _profile_stages, "counters": _profile_counters, "events": _trace_events}
+        for name, value in lru_counters.items():
+            snapshot["counters"][name] = value - _drained_lru_counters.get(name, 0)
+        _drained_lru_counters = lru_counters
+        _profile_stages, _profile_counters, _trace_events = {}, {}, []
+    return snapshot
+
+
+def merge_profile(snapshot):
+    """
+    Add profiling data drained from a worker to this process's totals.
+    
+    Args:
+        snapshot (dict): Result of drain_profile.
+    """
+    with _profile_lock:
+        for name, timing in snapshot["stages"].items():
+            stage = _profile_stages.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+            for field in stage:
+                stage[field] += timing[field]
+        for name, value in snapshot["counters"].items():
+            _profile_counters[name] = _profile_counters.get(name, 0) + value
+        _trace_events.extend(snapshot["events"])
+
+
+def print_profile():
+    """
+    Print the time spent per stage and the counters, slowest stage first.
+    
+    Stage times are inclusive, so create_canvas also contains the stages it calls.
+    """
+    counters = dict(_profile_counters)
+    for name, value in _lru_cache_counters().items():
+        counters[name] = counters.get(name, 0) + value - _drained_lru_counters.get(name, 0)
+    
+    print(f"\n{'stage':<28}{'calls':>7}{'wall ms':>11}{'cpu ms':>11}{'mean ms':>10}")
+    for name, stage in sorted(_profile_stages.items(), key=lambda item: -item[1]["wall"]):
+        print(f"{name:<28}{stage['calls']:>7}{stage['wall'] * 1000:>11.1f}{stage['cpu'] * 1000:>11.1f}"
+              f"{stage['wall'] * 1000 / stage['calls']:>10.2f}")
+    print()
+    for name, value in sorted(counters.items()):
+        print(f"{name:<28}{value:>18,}")
+
+
+def write_trace(path):
+    """
+    Write the recorded stages as a Chrome trace (open it in chrome://tracing or Perfetto).
+    
+    Args:
+        path (str): Destination JSON file.
+    """
+    with open(path, "w") as file:
+        json.dump({"traceEvents": _trace_events, "displayTimeUnit": "ms", "otherData": _profile_counters}, file)
+
+
+@profiled
+def load_image(path):
+    """
+    Open and decode an image once, reusing the decoded copy while the file is unchanged.
+    
+    The lock is only held to read and update the cache, so threads decoding different
+    files do not wait on each other.
+    
+    Args:
+        path (str): Path to the image file.
+        
+    Returns:
+        Image: Shared decoded image. Callers must not modify it in place.
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _decoded_asset_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        with Image.open(path) as image:
+            image.load()
+        profile_count("bytes decoded", stat.st_size)
+        cached = (stamp, image)
+        with _cache_lock:
+            _decoded_asset_cache[path] = cached
+    return cached[1]
+
+
+def set_opacity(image, opacity):
+    """
+    Scale the alpha channel of an RGBA image in a single channel operation.
+    
+    Args:
+        image (Image): RGBA image, modified in place.
+        opacity (float): Factor applied to every alpha value.
+        
+    Returns:
+        Image: The same image with adjusted opacity.
+    """
+    alpha = image.getchannel("A").point(lambda value: int(value * opacity))
+    image.putalpha(alpha)
+    return image
+
+
+def _scaled_logo(canvas_width, opacity):
+    """
+    Return the shared resized logo for a width and opacity, evicting the least recently used entry when full.
+    """
+    stat = os.stat(LOGO_PATH)
+    key = (LOGO_PATH, stat.st_mtime_ns, stat.st_size, canvas_width, opacity)
+    with _cache_lock:
+        if key in _logo_cache:
+            _logo_cache.move_to_end(key)
+            profile_count("logo cache hits")
+            return _logo_cache[key]
+    profile_count("logo cache misses")
+    
+    logo = load_image(LOGO_PATH)
+    
+    # Resize the logo while maintaining aspect ratio
+    logo = logo.resize((canvas_width, int((canvas_width / logo.width) * logo.height)))
+    profile_count("resizes")
+    if logo.mode != "RGBA":
+        logo = logo.convert("RGBA")
+    logo = set_opacity(logo, opacity)
+    
+    with _cache_lock:
+        _logo_cache[key] = logo
+        if len(_logo_cache) > LOGO_CACHE_SIZE:
+            _logo_cache.popitem(last=False)
+    return logo
+
+
 def get_resized_logo(canvas_width, opacity=0.5):
     """
     Resize the logo image while maintaining aspect ratio and adjusting opacity.
@@ -24,39 +390,400 @@ def get_resized_logo(canvas_width, opacity=0.5):
     Returns:
         Image: Resized logo image with adjusted opacity.
     """
-    logo_path = "logo/logo.png"
-    logo = Image.open(logo_path)
+    return _scaled_logo(canvas_width, opacity).copy()
+
+
+def get_resized_background_logo(canvas_width):
+    # 50% opacity for composite
+    return get_resized_logo(canvas_width, opacity=0.5)
+
+def _load_roster_index():
+    # Entries stored by an earlier run, or none if the index is missing, unreadable or for another folder
+    if not roster_index_path or not os.path.exists(roster_index_path):
+        return {}
+    try:
+        with open(roster_index_path, "r") as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if index.get("renders_dir") != os.path.abspath(RENDERS_DIR):
+        return {}
+    return index.get("characters", {})
+
+
+def _index_render(path, stat):
+    # Decode a render once to record its dimensions, mode and the bounding box of its visible pixels
+    with Image.open(path) as image:
+        bbox = image.convert("RGBA").getchannel("A").getbbox()
+        profile_count("bytes decoded", stat.st_size)
+        return {
+            "path": path,
+            "mtime_ns": stat.st_mtime_ns,
+            "file_size": stat.st_size,
+            "size": list(image.size),
+            "mode": image.mode,
+            "alpha_bbox": list(bbox) if bbox else None,
+        }
+
+
+@synchronized
+def get_roster(refresh=False):
+    """
+    Get the index of the character renders, building it on first use.
     
-    # Resize the logo while maintaining aspect ratio
-    logo = logo.resize((canvas_width, int((canvas_width / logo.width) * logo.height)))
+    Renders are only decoded when their mtime or size differs from the index stored by an
+    earlier run, so the index is cheap to keep up to date.
     
-    # Adjust the opacity of the logo to the specified value
-    logo = logo.convert("RGBA")
-    data = list(logo.getdata())
-    for i, item in enumerate(data):
-        data[i] = item[:-1] + (int(item[3] * opacity),)
-    logo.putdata(data)
+    Args:
+        refresh (bool): Check the `renders` folder for changes again, e.g. before a new build.
+        
+    Returns:
+        dict: `characters` maps every folder in `renders` to its entry (path, mtime, file size,
+        dimensions, mode and alpha bounding box), or to None if it has no 1.png.
+        `aliases` maps lowercase names to folder names.
+    """
+    global _roster
+    if _roster is not None and not refresh:
+        return _roster
     
-    return logo
+    previous = _roster["characters"] if _roster is not None else _load_roster_index()
+    characters = {}
+    for name in sorted(os.listdir(RENDERS_DIR)):
+        if not os.path.isdir(os.path.join(RENDERS_DIR, name)):
+            continue
+        path = os.path.join(RENDERS_DIR, name, "1.png")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            characters[name] = None
+            continue
+        entry = previous.get(name)
+        if entry is None or (entry["path"], entry["mtime_ns"], entry["file_size"]) != (path, stat.st_mtime_ns, stat.st_size):
+            entry = _index_render(path, stat)
+        characters[name] = entry
+    
+    aliases = {}
+    for name in characters:
+        aliases.setdefault(name.lower(), name)
+    
+    if roster_index_path and characters != previous:
+        os.makedirs(os.path.dirname(roster_index_path), exist_ok=True)
+        temp_path = f"{roster_index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump({"renders_dir": os.path.abspath(RENDERS_DIR), "characters": characters}, file, indent=2)
+        os.replace(temp_path, roster_index_path)
+    _roster = {"characters": characters, "aliases": aliases}
+    return _roster
 
 
-def get_resized_background_logo(canvas_width):
-    logo_path = "logo/logo.png"
-    logo = Image.open(logo_path)
+def find_character(character):
+    """
+    Find a character's folder in `renders`, ignoring case, so `PTX` finds `renders/ptx`.
+    
+    Args:
+        character (str): Character name as written in the ranking.
+        
+    Returns:
+        str: Name of the folder, or None if there is no such character.
+    """
+    roster = get_roster()
+    if character in roster["characters"]:
+        return character
+    return roster["aliases"].get(character.lower())
 
-    # Resize the logo while maintaining aspect ratio
-    logo = logo.resize((canvas_width, int((canvas_width / logo.width) * logo.height)))
 
-    # Adjust the opacity of the logo for the composite background
-    logo = logo.convert("RGBA")
-    data = list(logo.getdata())
-    for i, item in enumerate(data):
-        data[i] = item[:-1] + (int(item[3] * 0.5),)  # 50% opacity for composite
-    logo.putdata(data)
+def check_character(character):
+    """
+    Check that a character exists and has a render, without decoding anything.
     
-    return logo
+    Args:
+        character (str): Character name as written in the ranking.
+        
+    Raises:
+        ValueError: If the character is unknown or its folder has no 1.png.
+    """
+    name = find_character(character)
+    if name is None:
+        suggestions = difflib.get_close_matches(character.lower(), get_roster()["aliases"], n=3)
+        hint = f", did you mean {' or '.join(suggestions)}?" if suggestions else ""
+        raise ValueError(f"unknown character {character!r}{hint}")
+    if get_roster()["characters"][name] is None:
+        raise ValueError(f"character {character!r} has no render, {render_path(name)} is missing")
+
+
+def render_path(character):
+    """
+    Get the path of a character's render.
+    
+    Args:
+        character (str): Name of the character folder in `renders`, in any case.
+        
+    Returns:
+        str: Path to the character's 1.png.
+    """
+    return os.path.join(RENDERS_DIR, find_character(character) or character, "1.png")
+
+
+def build_atlas():
+    """
+    Trim every character render to its alpha bounding box and pack the raw pixels into one atlas file.
+    
+    The file starts with ATLAS_MAGIC, the length of a JSON table and the table, which gives every
+    sprite's offset, mode, trimmed box, full frame size and the source file's mtime and size. The
+    sprites follow one after another, each 64-byte aligned and stored row by row, so every sprite
+    is a contiguous range the renderer can map without decoding.
+    
+    Returns:
+        int: Number of sprites packed.
+    """
+    global _atlas
+    sprites = {}
+    chunks = []
+    offset = 0
+    for name, entry in get_roster(refresh=True)["characters"].items():
+        if entry is None or entry["mode"] not in ATLAS_MODES:
+            continue
+        box = entry["alpha_bbox"] or [0, 0, 0, 0]
+        with Image.open(entry["path"]) as image:
+            data = image.crop(box).tobytes() if box[2] > box[0] and box[3] > box[1] else b""
+        sprites[name] = {
+            "offset": offset,
+            "mode": entry["mode"],
+            "box": box,
+            "frame": entry["size"],
+            "path": entry["path"],
+            "mtime_ns": entry["mtime_ns"],
+            "file_size": entry["file_size"],
+        }
+        padding = -len(data) % 64
+        chunks.append(data + b"\0" * padding)
+        offset += len(data) + padding
+    
+    table = json.dumps({"renders_dir": os.path.abspath(RENDERS_DIR), "sprites": sprites}).encode()
+    header = ATLAS_MAGIC + struct.pack(">I", len(table)) + table
+    header += b"\0" * (-len(header) % 64)
+    
+    os.makedirs(os.path.dirname(atlas_path), exist_ok=True)
+    temp_path = f"{atlas_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(header)
+        file.writelines(chunks)
+    os.replace(temp_path, atlas_path)
+    # Map the new file next time; sprites already handed out keep the old mapping alive
+    _atlas = None
+    return len(sprites)
+
+
+def remove_atlas():
+    """
+    Delete the atlas file so renders are decoded from their PNGs again.
+    """
+    global _atlas
+    _atlas = None
+    if atlas_path and os.path.exists(atlas_path):
+        os.remove(atlas_path)
+
+
+def _open_atlas():
+    # Map the atlas file read-only, or return None if it is missing, damaged or for another folder
+    if not atlas_path or not os.path.exists(atlas_path):
+        return None
+    with open(atlas_path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+    prefix = len(ATLAS_MAGIC) + 4
+    if data[:len(ATLAS_MAGIC)] != ATLAS_MAGIC:
+        return None
+    table_length, = struct.unpack(">I", data[len(ATLAS_MAGIC):prefix])
+    try:
+        table = json.loads(data[prefix:prefix + table_length])
+    except ValueError:
+        return None
+    if table.get("renders_dir") != os.path.abspath(RENDERS_DIR):
+        return None
+    base = prefix + table_length + (-(prefix + table_length) % 64)
+    return {"data": memoryview(data), "base": base, "sprites": table["sprites"]}
+
+
+@synchronized
+def get_atlas():
+    """
+    Get the memory-mapped atlas, mapping it on first use.
+    
+    Returns:
+        dict: The mapped `data`, the offset of the first sprite (`base`) and the `sprites` table,
+        or an empty dict when there is no usable atlas.
+    """
+    global _atlas
+    if _atlas is None:
+        _atlas = _open_atlas() or {}
+    return _atlas
+
+
+def get_sprite(character, entry):
+    """
+    Get a character's render from the atlas, re-expanded to its full frame.
+    
+    The trimmed pixels are read straight from the mapped file. Everything outside the trimmed box
+    is fully transparent, and resizing premultiplies alpha, so the resized render is identical to
+    one resized from the decoded PNG.
+    
+    Args:
+        character (str): Name of the character folder.
+        entry (dict): The character's roster entry.
+        
+    Returns:
+        Image: The full-size render, or None if the atlas has no up-to-date sprite for it.
+    """
+    atlas = get_atlas()
+    sprite = atlas.get("sprites", {}).get(character)
+    if sprite is None or (sprite["path"], sprite["mtime_ns"], sprite["file_size"]) != (entry["path"], entry["mtime_ns"], entry["file_size"]):
+        return None
+    
+    left, top, right, bottom = sprite["box"]
+    frame = Image.new(sprite["mode"], tuple(sprite["frame"]))
+    if right > left and bottom > top:
+        size = (right - left, bottom - top)
+        start = atlas["base"] + sprite["offset"]
+        length = size[0] * size[1] * len(sprite["mode"])
+        view = Image.frombuffer(sprite["mode"], size, atlas["data"][start:start + length], "raw", sprite["mode"], 0, 1)
+        frame.paste(view, (left, top))
+    profile_count("atlas hits")
+    return frame
+
+
+def fit_render_size(width, height, fixed_width, fixed_height):
+    """
+    Calculate the size of a render scaled to the fixed height, or to the fixed width if it would be wider.
+    
+    Args:
+        width (int): Width of the source render.
+        height (int): Height of the source render.
+        fixed_width (int): Maximum width.
+        fixed_height (int): Target height.
+        
+    Returns:
+        tuple: New (width, height).
+    """
+    new_width = int((fixed_height / height) * width)
+    if new_width > fixed_width:
+        return fixed_width, int((fixed_width / width) * height)
+    return new_width, fixed_height
+
+
+def _render_cache_file(character, key):
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    return os.path.join(render_cache_dir, f"{character}-{digest}.png")
+
+
+@profiled
+def get_cached_render(character, fixed_width, fixed_height, card_size=None):
+    """
+    Get a character render resized for a card, going through the in-memory LRU and the on-disk cache.
+    
+    Entries are keyed by the source path, its mtime and size from the roster, and the target
+    dimensions, so editing a render invalidates everything built from it. In preview mode the
+    render is resized straight to `card_size` with cheaper filters and kept in memory only.
+    
+    The lock is only held to look up and insert entries. Decoding and resizing run outside it,
+    so threads resizing different characters do not wait on each other; two threads missing the
+    same entry at once both build it and the second insert wins.
+    
+    Args:
+        character (str): Name of the character.
+        fixed_width (int): Width the render is fitted into.
+        fixed_height (int): Height the render is fitted into.
+        card_size (tuple): If given, the fitted render is resized again to exactly this size.
+        
+    Returns:
+        Image: Shared resized render. Callers must not modify it in place.
+    """
+    character = find_character(character) or character
+    entry = get_roster()["characters"].get(character)
+    if entry is None:
+        raise FileNotFoundError(f"No render for character {character!r}: {render_path(character)} is missing")
+    path = entry["path"]
+    key = (path, entry["mtime_ns"], entry["file_size"], fixed_width, fixed_height, card_size)
+    preview = preview_factor > 1 and card_size is not None
+    if preview:
+        key += ("preview",)
+    with _cache_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            profile_count("render cache hits")
+            return _render_cache[key]
+    
+    image = None
+    # Previews are cheap to rebuild, so they are not written to disk
+    cache_file = _render_cache_file(character, key) if render_cache_dir and not preview else None
+    if cache_file and os.path.exists(cache_file):
+        with Image.open(cache_file) as cached:
+            cached.load()
+            image = cached
+        profile_count("render cache disk hits")
+        profile_count("bytes decoded", os.path.getsize(cache_file))
+    else:
+        profile_count("render cache misses")
+        if card_size is None or preview:
+            # Prefer the trimmed sprite mapped from the atlas over decoding the PNG
+            source = get_sprite(character, entry)
+            if source is None:
+                with Image.open(path) as source:
+                    source.load()
+                profile_count("bytes decoded", entry["file_size"])
+        if preview:
+            # Shrink by whole factors with a box filter, then go straight to the card size bilinearly
+            factor = min(source.width // card_size[0], source.height // card_size[1])
+            if factor >= 2:
+                source = source.reduce(factor)
+            image = source.resize(card_size, Image.BILINEAR)
+        elif card_size is None:
+            new_size = fit_render_size(source.width, source.height, fixed_width, fixed_height)
+            image = source.resize(new_size, True)
+        else:
+            image = get_cached_render(character, fixed_width, fixed_height).resize(card_size, True)
+        profile_count("resizes")
+        if cache_file:
+            os.makedirs(render_cache_dir, exist_ok=True)
+            save_image_atomic(image, cache_file, compress_level=1)
+    
+    with _cache_lock:
+        _render_cache[key] = image
+        if len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return image
+
+
+def warm_render_cache(fixed_width, fixed_height):
+    """
+    Build the cached renders of every character for the given card dimensions.
+    
+    Args:
+        fixed_width (int): Card width.
+        fixed_height (int): Card height.
+        
+    Returns:
+        int: Number of characters warmed.
+    """
+    characters = [name for name, entry in get_roster(refresh=True)["characters"].items() if entry is not None]
+    for character in characters:
+        get_cached_render(character, fixed_width, fixed_height, card_size=(fixed_width // 2, fixed_height))
+    return len(characters)
+
+
+def purge_render_cache():
+    """
+    Delete the on-disk render cache and empty the in-memory LRU.
+    """
+    _render_cache.clear()
+    if render_cache_dir and os.path.exists(render_cache_dir):
+        shutil.rmtree(render_cache_dir)
+
 
-def get_character_images(character1, character2, fixed_width, fixed_height):
+@profiled
+def get_character_images(character1, character2, fixed_width, fixed_height, card_size=None):
     """
     Load and resize images of two characters to a fixed width and height while maintaining aspect ratio.
     
@@ -65,44 +792,49 @@ def get_character_images(character1, character2, fixed_width, fixed_height):
         character2 (str): Name of the second character.
         fixed_width (int): The target width for the resized character renders.
         fixed_height (int): The target height for the resized character renders.
+        card_size (tuple): If given, also resize both renders to this size, as create_canvas does.
         
     Returns:
         tuple: Resized images of character1 and character2.
     """
-    char1_image_path = os.path.join("renders", character1, "1.png")
-    char2_image_path = os.path.join("renders", character2, "1.png")
+    char1_image_path = render_path(character1)
+    char2_image_path = render_path(character2)
     
     # Print the paths being accessed
     print(f"Accessing image from: {char1_image_path}")
     print(f"Accessing image from: {char2_image_path}")
 
-    char1_image = Image.open(char1_image_path)
-    char2_image = Image.open(char2_image_path)
+    char1_image = get_cached_render(character1, fixed_width, fixed_height, card_size)
+    char2_image = get_cached_render(character2, fixed_width, fixed_height, card_size)
 
-    # Calculate new dimensions while maintaining aspect ratio
-    new_width1 = int((fixed_height / char1_image.height) * char1_image.width)
-    new_width2 = int((fixed_height / char2_image.height) * char2_image.width)
-
-    if new_width1 > fixed_width:
-        new_width1 = fixed_width
-        new_height1 = int((fixed_width / char1_image.width) * char1_image.height)
-    else:
-        new_height1 = fixed_height
-
-    if new_width2 > fixed_width:
-        new_width2 = fixed_width
-        new_height2 = int((fixed_width / char2_image.width) * char2_image.height)
-    else:
-        new_height2 = fixed_height
+    return char1_image, char2_image
 
-    # Resize images to fixed dimensions
-    char1_image = char1_image.resize((new_width1, new_height1), True)
-    char2_image = char2_image.resize((new_width2, new_height2), True)
 
-    return char1_image, char2_image
 
+@functools.lru_cache(maxsize=GRADIENT_CACHE_SIZE)
+def get_rotated_layer(size, colors, angle):
+    """
+    Build a square gradient (or a solid square for a single color) rotated with expand, memoized per size, palette and angle.
+    
+    The layer is RGBA so its alpha channel doubles as the paste mask, which
+    replaces the separate threshold pass over the rotated image.
+    
+    Args:
+        size (int): Side length of the square before rotation.
+        colors (tuple): Palette of RGB tuples.
+        angle (float): Rotation in degrees, counter clockwise.
+        
+    Returns:
+        Image: Shared rotated RGBA layer, transparent outside the square.
+    """
+    if len(colors) == 1:
+        square = Image.new('RGBA', (size, size), colors[0])
+    else:
+        square = create_gradient(size, size, colors).convert('RGBA')
+    return square.rotate(angle, expand=1)
 
 
+@profiled
 def paste_gradient_on_canvas(canvas):
     """
     Paste a rotated gradient image onto the canvas using a mask.
@@ -116,20 +848,17 @@ def paste_gradient_on_canvas(canvas):
     gradient_size = int((canvas.width**1 + canvas.height**2)**0.45)
     
     # Create gradient and rotate it by 45 degrees
-    gradient = create_gradient(gradient_size, gradient_size)  # Missing function implementation
-    rotated_gradient = gradient.rotate(45, expand=1)
+    rotated_gradient = get_rotated_layer(gradient_size, tuple(gradient_palette), 45)
     
     diagonal_length = (gradient_size**2 + gradient_size**2)**0.5
-    
-    # Create a mask from the rotated gradient and position variables
-    mask = rotated_gradient.convert('L').point(lambda x: 255 if x > 0 else 0, mode='1')
     position_x = -int(diagonal_length / 2)
     position_y = position_x
     
-    # Paste rotated gradient onto the canvas using the mask
-    canvas.paste(rotated_gradient, (position_x, position_y), mask)
+    # Paste rotated gradient onto the canvas using its alpha as the mask
+    canvas.paste(rotated_gradient, (position_x, position_y), rotated_gradient)
     
     return canvas
+@profiled
 def paste_light_blue_square(canvas):
     """
     Paste a rotated light blue square onto the canvas using a mask.
@@ -143,22 +872,19 @@ def paste_light_blue_square(canvas):
     gradient_size = int((canvas.width**1 + canvas.height**2)**0.45)
     
     # Create a light blue square and rotate it
-    blue_square = Image.new('RGB', (gradient_size, gradient_size), (173, 216, 230))
-    rotated_blue = blue_square.rotate(-47, expand=1)
+    rotated_blue = get_rotated_layer(gradient_size, ((173, 216, 230),), -47)
     
     diagonal_length = (gradient_size**2 + gradient_size**2)**0.5
     blue_position_x = -int(diagonal_length / 2) + 10
     blue_position_y = blue_position_x + 5
     
-    # Create a mask from the rotated blue square
-    blue_mask = rotated_blue.convert('L').point(lambda x: 255 if x > 0 else 0, mode='1')
-    
-    # Paste rotated blue square onto the canvas using the mask
-    canvas.paste(rotated_blue, (blue_position_x, blue_position_y), blue_mask)
+    # Paste rotated blue square onto the canvas using its alpha as the mask
+    canvas.paste(rotated_blue, (blue_position_x, blue_position_y), rotated_blue)
     
     return canvas
 
-def paste_character_renders(canvas, char1_image, char2_image):
+@profiled
+def paste_character_renders(canvas, char1_image, char2_image, scale=1):
     """
     Paste character renders onto the canvas at specific positions.
     
@@ -166,6 +892,7 @@ def paste_character_renders(canvas, char1_image, char2_image):
         canvas (Image): The canvas image onto which the renders will be pasted.
         char1_image (Image): Image of the first character.
         char2_image (Image): Image of the second character.
+        scale (float): Scale of the canvas relative to a full-size card, below 1 for previews.
         
     Returns:
         Image: Canvas image with character renders pasted.
@@ -183,52 +910,52 @@ def paste_character_renders(canvas, char1_image, char2_image):
         canvas.paste(char2_image, (500, char1_image.height))
         
     else:
-        canvas.paste(char1_image, (50, 0), char1_image if char1_image.mode == 'RGBA' else None)
+        margin = round(50 * scale)
+        canvas.paste(char1_image, (margin, 0), char1_image if char1_image.mode == 'RGBA' else None)
         if char2_image:
-            canvas.paste(char2_image, (char1_image.width - 50, 0), char2_image if char2_image.mode == 'RGBA' else None)
+            canvas.paste(char2_image, (char1_image.width - margin, 0), char2_image if char2_image.mode == 'RGBA' else None)
   
     
     return canvas
 
-def draw_winner_info_on_canvas(canvas, winner_name, rank_number):
+def layout_winner_info(width, height, winner_name, rank_number, scale=1):
     """
-    Draw winner information on the canvas.
+    Lay out the winner's name and the rank number of a card.
     
     Args:
-        canvas (Image): The canvas image on which the winner information will be drawn.
+        width (int): Card width.
+        height (int): Card height.
         winner_name (str): Name of the winner.
         rank_number (int): The rank/position of the winner.
+        scale (float): Scale of the card relative to a full-size card. Below 1 (previews) the
+            shadow is skipped and the outline is one pixel thick.
         
     Returns:
-        Image: Canvas image with winner information drawn.
+        list: Keyword arguments for draw_text_with_effects, one dict per text in drawing order.
     """
-    draw = ImageDraw.Draw(canvas)
-    font = general_font_small
-    min_font_size = 30  # set a minimum font size
+    font = get_font(round(general_font_small.size * scale))
+    min_font_size = round(30 * scale)  # set a minimum font size
+    effects = {"shadow": (255, 220, 220), "thickness": 3} if scale == 1 else {"shadow": None, "thickness": 1}
     
-    left_margin = 50  # Define left border
-    right_margin = canvas.width - 50  # Define right border
+    left_margin = round(50 * scale)  # Define left border
+    right_margin = width - left_margin  # Define right border
     max_width = right_margin - left_margin  # maximum allowable width for the text
     
-    # Calculate text bounding box for winner's name
-    temp_image = Image.new('RGBA', (1, 1))
-    temp_draw = ImageDraw.Draw(temp_image)
-    bbox = temp_draw.textbbox((0,0), winner_name, font=font)
+    # Pick the largest font size in 5 unit steps that fits, without going below the minimum font size
+    sizes = [font.size]
+    while sizes[-1] > min_font_size:
+        sizes.append(sizes[-1] - max(round(5 * scale), 1))  # reduce font size by 5 units
+    font = get_font(fit_font_size(winner_name, sizes, max_width))
+    bbox = measure_text(winner_name, font)
     text_width, text_height = bbox[2] - bbox[0], bbox[3] - bbox[1]
     
-    # Reduce font size if text width exceeds max width, but don't go below minimum font size
-    while text_width > max_width and font.size > min_font_size:
-        font = ImageFont.truetype(GENERAL_FONT_PATH, font.size - 5)  # reduce font size by 5 units
-        bbox = temp_draw.textbbox((0,0), winner_name, font=font)
-        text_width, text_height = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    
     # If text width still exceeds max width after reaching minimum font size, break the text into multiple lines
     if text_width > max_width:
         winner_name = "\n".join(winner_name.split(maxsplit=1))
     
     # Calculate text position for winner's name
-    text_x = (canvas.width - text_width) // 2
-    text_y = canvas.height - 80 - (text_height // 2 if "\n" in winner_name else 0)  # Adjust position if text is on multiple lines
+    text_x = (width - text_width) // 2
+    text_y = height - round(80 * scale) - (text_height // 2 if "\n" in winner_name else 0)  # Adjust position if text is on multiple lines
     
     # Ensure text doesn't exceed left or right margins. If it does, adjust `text_x` accordingly.
     if text_x < left_margin:
@@ -236,12 +963,32 @@ def draw_winner_info_on_canvas(canvas, winner_name, rank_number):
     elif text_x + text_width > right_margin:
         text_x = right_margin - text_width
     
-    # Draw winner's name using calculated position
-    draw_text_with_effects(draw, text_x, text_y, winner_name, font, fill="white", outline="black", shadow=(255, 220, 220), thickness=3)
+    # Winner's name, then the ranking number in the larger font
+    large_font = get_font(round(general_font_large.size * scale))
+    position = round(10 * scale)
+    return [
+        dict(x=text_x, y=text_y, text=winner_name, font=font, fill="white", outline="black", **effects),
+        dict(x=position, y=position, text=f"{rank_number}.", font=large_font, fill="white", outline="black", **effects),
+    ]
+
+
+@profiled
+def draw_winner_info_on_canvas(canvas, winner_name, rank_number, scale=1):
+    """
+    Draw winner information on the canvas.
     
-    # Draw ranking number using larger font
-    large_font = general_font_large
-    draw_text_with_effects(draw, 10, 10, f"{rank_number}.", large_font, fill="white", outline="black", shadow=(255, 220, 220), thickness=3)
+    Args:
+        canvas (Image): The canvas image on which the winner information will be drawn.
+        winner_name (str): Name of the winner.
+        rank_number (int): The rank/position of the winner.
+        scale (float): Scale of the canvas relative to a full-size card, below 1 for previews.
+        
+    Returns:
+        Image: Canvas image with winner information drawn.
+    """
+    draw = ImageDraw.Draw(canvas)
+    for text in layout_winner_info(canvas.width, canvas.height, winner_name, rank_number, scale):
+        draw_text_with_effects(draw, **text)
     
     return canvas
 
@@ -249,36 +996,99 @@ def draw_winner_info_on_canvas(canvas, winner_name, rank_number):
 
 
 
-def draw_text_with_effects(draw, x, y, text, font, fill, outline, shadow, thickness=3, shadow_offset=(4, 4)):
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def measure_text(text, font):
     """
-    Draws text with an outline and a drop shadow.
+    Measure the bounding box of text drawn at the origin, remembering recent results.
     
     Args:
-        draw (ImageDraw.Draw): The drawing context.
-        x (int): x-coordinate of text position.
-        y (int): y-coordinate of text position.
+        text (str): Text to measure, may contain newlines.
+        font (ImageFont): Font to be used.
+        
+    Returns:
+        tuple: (left, top, right, bottom) bounding box.
+    """
+    return _measure_draw.textbbox((0, 0), text, font=font)
+
+
+def fit_font_size(text, sizes, max_width):
+    """
+    Binary search for the largest font size whose text width fits.
+    
+    Args:
+        text (str): Text to fit.
+        sizes (list): Candidate font sizes in descending order.
+        max_width (int): Maximum allowed text width.
+        
+    Returns:
+        int: The first size in `sizes` that fits, or the last size if none does.
+    """
+    low, high = 0, len(sizes) - 1
+    while low < high:
+        middle = (low + high) // 2
+        bbox = measure_text(text, get_font(sizes[middle]))
+        if bbox[2] - bbox[0] <= max_width:
+            high = middle
+        else:
+            low = middle + 1
+    return sizes[low]
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def get_text_mask(text, font):
+    """
+    Rasterize text into a grayscale mask once, remembering recent results such as rank numbers.
+    
+    Args:
+        text (str): Text to rasterize, may contain newlines.
+        font (ImageFont): Font to be used.
+        
+    Returns:
+        tuple: ('L' mask, (left, top)) where (left, top) is the mask's offset from the text position.
+    """
+    left, top, right, bottom = measure_text(text, font)
+    mask = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+    return mask, (left, top)
+
+
+@profiled
+def draw_text_with_effects(draw, x, y, text, font, fill, outline, shadow, thickness=3, shadow_offset=(4, 4)):
+    """
+    Draws text with an outline and a drop shadow.
+    
+    Args:
+        draw (ImageDraw.Draw): The drawing context.
+        x (int): x-coordinate of text position.
+        y (int): y-coordinate of text position.
         text (str): Text to be drawn.
         font (ImageFont): Font to be used.
         fill (tuple): RGB tuple for text color.
         outline (tuple): RGB tuple for outline color.
-        shadow (tuple): RGB tuple for shadow color.
+        shadow (tuple): RGB tuple for shadow color, or None for no shadow.
         thickness (int): Thickness of the outline.
         shadow_offset (tuple): (x, y) offsets for the shadow.
         
     Returns:
         None
     """
+    # Rasterize the text once and stamp the same mask for the shadow, outline and fill
+    mask, (left, top) = get_text_mask(text, font)
+    x, y = x + left, y + top
+    
     # Draw the shadow
-    draw.text((x + shadow_offset[0], y + shadow_offset[1]), text, font=font, fill=shadow)
+    if shadow is not None:
+        draw.bitmap((x + shadow_offset[0], y + shadow_offset[1]), mask, fill=shadow)
     
-    # Draw the text multiple times with offsets to create the outline
+    # Stamp the text multiple times with offsets to create the outline
     for offset_x in range(-thickness, thickness + 1):
         for offset_y in range(-thickness, thickness + 1):
-            draw.text((x + offset_x, y + offset_y), text, font=font, fill=outline)
+            draw.bitmap((x + offset_x, y + offset_y), mask, fill=outline)
     
     # Draw the original text
-    draw.text((x, y), text, font=font, fill=fill)
+    draw.bitmap((x, y), mask, fill=fill)
 
+@profiled
 def draw_rectangles_on_canvas(canvas):
     """
     Draw rounded rectangles on the canvas with different colors and positions.
@@ -307,36 +1117,22 @@ def draw_rectangles_on_canvas(canvas):
     
     return canvas
 
-def create_gradient(width, height):
+def create_gradient(width, height, colors=PASTEL_RAINBOW):
     """
     Create a gradient image using pastel rainbow colors.
     
     Args:
         width (int): Width of the gradient image.
         height (int): Height of the gradient image.
+        colors (tuple): RGB colors to interpolate from top to bottom (default pastel rainbow).
         
     Returns:
         Image: Gradient image with pastel rainbow colors.
     """
-    # Define pastel rainbow colors
-    colors = [
-        (255, 102, 102),      # Pastel Red
-        (255, 178, 102),     # Pastel Orange
-        (255, 255, 102),     # Pastel Yellow
-        (178, 255, 102),     # Pastel Green
-        (102, 178, 255),     # Pastel Blue
-        (178, 102, 255),     # Pastel Indigo
-        (255, 102, 178)      # Pastel Violet
-    ]
-    
-    # Create an empty gradient image
-    gradient = Image.new('RGB', (width, height))
-    draw = ImageDraw.Draw(gradient)
-    
-    # Draw the gradient
-    for y in range(height):
-        r, g, b = get_color_at(colors, y / height)  # Missing function implementation
-        draw.line((0, y, width, y), fill=(r, g, b))
+    # Build the color ramp as a single column, then stretch it across the width
+    ramp = bytes(channel for y in range(height) for channel in get_color_at(colors, y / height))
+    column = Image.frombytes('RGB', (1, height), ramp)
+    gradient = column.resize((width, height), Image.NEAREST)
     
     return gradient
 
@@ -367,6 +1163,7 @@ def get_color_at(colors, position):
     
     return r, g, b
 
+@profiled
 def generate_rounded_mask(size, radius=30):
     """
     Generate a rounded rectangle mask.
@@ -384,62 +1181,713 @@ def generate_rounded_mask(size, radius=30):
     draw.rounded_rectangle([(0, 0), (width, height)], radius=radius, fill=255)
     return mask
 
-def compile_images():
-   
-    # Load the images
-    images = [Image.open(f'rankings/{i}.png') for i in range(1, 9)]
+def _classic_layout(x0, y0, comp_width, comp_height, count):
+    """
+    Place up to 8 cards in three tiers: rank 1 on the left, 2-4 in a row and 5-8 below them.
     
-    # Composite dimensions
-    comp_width, comp_height = 1920, 1080
-    # Create a blank composite image
-    composite = Image.new('RGBA', (comp_width, comp_height), (0, 0, 0, 0))
+    Gaps are scaled from the original 1920x1080 layout, so that size gives the original positions.
     
-    # Add the new background logo
-    bg_logo = get_resized_logo(int(comp_width/2), opacity=0.8)  # 0.8 is 80% opacity
-    composite.paste(bg_logo, (0, (comp_height - bg_logo.height) // 2), bg_logo)
-
-    # Determine the size for the first image
+    Returns:
+        list: (x, y, width, height) boxes for ranks 1 to min(count, 8).
+    """
+    scale_x, scale_y = comp_width / 1920, comp_height / 1080
+    
+    # Determine the size for the first image, images 2-4 and images 5-8
     img1_width = int(comp_width/2.6)
     img1_height = int(comp_height/2.2)
-    images[0] = images[0].resize((img1_width, img1_height))
-
-    # Determine the size for images 2-4
     img24_width = int(img1_width/2)
     img24_height = int(img1_height/1.5)
-    for i in range(1, 4):
-        images[i] = images[i].resize((img24_width, img24_height))
-
-    # Determine the size for images 5-8
     img58_width = int(img24_width/1.5)
     img58_height = int(img24_height/1.3)
-    for i in range(4, 8):
-        images[i] = images[i].resize((img58_width, img58_height))
     
+    # Image 1 on the left
+    y_position_1 = (comp_height - img1_height) // 2
+    boxes = [(x0, y0 + y_position_1, img1_width, img1_height)]
+    
+    # Images 2-4 on the right of image 1, in a row (horizontally)
+    x_start_24 = img1_width + round(5 * scale_x)
+    y_position_24 = y_position_1 - round(20 * scale_y)
+    for _ in range(3):
+        boxes.append((x0 + x_start_24, y0 + y_position_24, img24_width, img24_height))
+        x_start_24 += img24_width + round(15 * scale_x)
+    
+    # Images 5-8 below images 2-4, in a row (horizontally)
+    x_start_58 = img1_width + round(50 * scale_x)
+    y_position_58 = y_position_24 + img24_height
+    for _ in range(4):
+        boxes.append((x0 + x_start_58, y0 + y_position_58, img58_width, img58_height))
+        x_start_58 += img58_width + round(20 * scale_x)
+    
+    return boxes[:count]
+
+
+def _grid_layout(x0, y0, width, height, count, gap):
+    """
+    Place cards in the largest grid of equal tiles that fits the area, centered horizontally.
+    
+    Returns:
+        list: (x, y, width, height) boxes in row-major order.
+    """
+    aspect = fixed_width / fixed_height
+    best_columns, best_width = 1, 0
+    for columns in range(1, count + 1):
+        rows = -(-count // columns)
+        tile_width = min((width - (columns + 1) * gap) / columns, (height - (rows + 1) * gap) / rows * aspect)
+        if tile_width > best_width:
+            best_columns, best_width = columns, tile_width
+    
+    tile_width = max(int(best_width), 1)
+    tile_height = max(int(best_width / aspect), 1)
+    row_width = best_columns * tile_width + (best_columns - 1) * gap
+    left = x0 + (width - row_width) // 2
+    return [(left + (index % best_columns) * (tile_width + gap), y0 + gap + (index // best_columns) * (tile_height + gap),
+             tile_width, tile_height)
+            for index in range(count)]
 
+
+def composite_layout(count, comp_width, comp_height):
+    """
+    Lay out the composite for the top `count` cards at any resolution.
     
-    # Paste image 1 on the left
-    y_position_1 = (comp_height - img1_height) // 2
-    composite.paste(images[0], (0, y_position_1))
+    The top 8 use the three tier layout. Beyond 8 cards, the tiers move into the upper part of
+    the image and the remaining ranks fill a grid of equal tiles below them.
+    
+    Args:
+        count (int): Number of cards.
+        comp_width (int): Composite width.
+        comp_height (int): Composite height.
+        
+    Returns:
+        list: (x, y, width, height) box of each card, in rank order.
+    """
+    if count <= 8:
+        return _classic_layout(0, 0, comp_width, comp_height, count)
     
-    # Paste images 2-4 on the right of image 1, in a row (horizontally)
-    x_start_24 = img1_width + 5
-    y_position_24 = y_position_1 - 20
-    for i in range(1, 4):
-        composite.paste(images[i], (x_start_24, y_position_24))
-        x_start_24 += img24_width + 15
+    tiers_height = int(comp_height * COMPOSITE_TIERS_FRACTION)
+    gap = max(round(10 * comp_width / 1920), 1)
+    boxes = _classic_layout(0, 0, comp_width, tiers_height, 8)
+    # Move the tiers up against the top edge to leave the rest of the height to the grid
+    shift = min(y for x, y, width, height in boxes) - gap
+    boxes = [(x, y - shift, width, height) for x, y, width, height in boxes]
+    tiers_bottom = max(y + height for x, y, width, height in boxes)
+    boxes += _grid_layout(0, tiers_bottom, comp_width, comp_height - tiers_bottom, count - 8, gap)
+    return boxes
 
-    # Paste images 5-8 below images 2-4, in a row (horizontally)
-    x_start_58 = img1_width + 50
-    y_position_58 = y_position_24 + img24_height
-    for i in range(4, 8):
-        composite.paste(images[i], (x_start_58, y_position_58))
-        x_start_58 += img58_width + 20
+
+def _paste_composite_band(band, top, bg_logo, logo_y, boxes, tiles):
+    # Paste the logo and the cards that overlap the band, in rank order, offset by the band's top row
+    band.paste(bg_logo, (0, logo_y - top), bg_logo)
+    for rank, (x, y, width, height) in enumerate(boxes, 1):
+        if y < top + band.height and y + height > top:
+            band.paste(tiles(rank), (x, y - top))
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _png_rows(image):
+    # Scanlines of an RGBA image with the PNG Sub filter: every byte minus the byte of the pixel to its left
+    stride = image.width * 4
+    left = ImageChops.offset(image, 1, 0)
+    left.paste((0, 0, 0, 0), (0, 0, 1, image.height))
+    data = ImageChops.subtract_modulo(image, left).tobytes()
+    return b"".join(b"\x01" + data[row * stride:(row + 1) * stride] for row in range(image.height))
+
+
+def save_png_in_bands(path, size, bands, compress_level=6):
+    """
+    Write an RGBA PNG from horizontal bands without ever holding the whole image.
+    
+    Rows are written with the PNG Sub filter, computed per band with a single channel operation.
+    
+    Args:
+        path (str): Destination file.
+        size (tuple): (width, height) of the image.
+        bands (iterable): RGBA images of the full width, top to bottom, adding up to the height.
+        compress_level (int): zlib compression level.
+    """
+    width, height = size
+    compressor = zlib.compressobj(compress_level)
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        for band in bands:
+            compressed = compressor.compress(_png_rows(band))
+            if compressed:
+                file.write(_png_chunk(b"IDAT", compressed))
+        file.write(_png_chunk(b"IDAT", compressor.flush()))
+        file.write(_png_chunk(b"IEND", b""))
+
+
+def resize_card(image, size):
+    """
+    Resize a card for the composite, with a cheap bilinear filter in preview mode.
+    
+    Args:
+        image (Image): The card.
+        size (tuple): New (width, height).
+        
+    Returns:
+        Image: The resized card.
+    """
+    if preview_factor > 1:
+        return image.resize(size, Image.BILINEAR)
+    return image.resize(size)
+
+
+def open_card_file(output_dir, rank):
+    """
+    Open a card written by an earlier run, for the composite.
+    
+    Args:
+        output_dir (str): Folder the card is in.
+        rank (int): The rank/position of the card.
+        
+    Returns:
+        Image: The card, decoded when it is first used.
+    """
+    card_path = output_file(output_dir, rank)
+    profile_count("bytes decoded", os.path.getsize(card_path))
+    return Image.open(card_path)
+
+
+def composite_bands(images, count, size, output_dir="rankings", band_height=None):
+    """
+    Build the composite from top to bottom in horizontal bands.
+    
+    Each card is resized once, when the first band overlapping it is built, and dropped
+    once the bands have moved past it.
+    
+    Args:
+        images (list): Cards for ranks 1 to `count`. Missing (None) entries are loaded from
+            `{output_dir}/{rank}` in the output format.
+        count (int): Number of top cards.
+        size (tuple): (width, height) of the composite.
+        output_dir (str): Folder missing cards are loaded from.
+        band_height (int): Rows per band, or None for a single band holding the whole composite.
+        
+    Yields:
+        Image: RGBA bands of the full width.
+    """
+    comp_width, comp_height = size
+    images = list(images or [])[:count]
+    images += [None] * (count - len(images))
+    band_height = band_height or comp_height
+    
+    boxes = composite_layout(count, comp_width, comp_height)
+    
+    # Add the new background logo (the shared copy, it is only read from)
+    bg_logo = _scaled_logo(int(comp_width/2), 0.8)  # 0.8 is 80% opacity
+    logo_y = (comp_height - bg_logo.height) // 2
+    
+    resized = {}
+    
+    def tiles(rank):
+        # Resize each card once, using the card handed over in memory or loading it from disk
+        if rank not in resized:
+            image = images[rank - 1]
+            if image is None:
+                image = open_card_file(output_dir, rank)
+            resized[rank] = resize_card(image, boxes[rank - 1][2:])
+            profile_count("resizes")
+        return resized[rank]
+    
+    for top in range(0, comp_height, band_height):
+        band = Image.new('RGBA', (comp_width, min(band_height, comp_height - top)), (0, 0, 0, 0))
+        _paste_composite_band(band, top, bg_logo, logo_y, boxes, tiles)
+        # Drop the cards that lie completely above the next band
+        for rank in [rank for rank in resized if sum(boxes[rank - 1][1::2]) <= top + band.height]:
+            del resized[rank]
+        yield band
+
+
+@profiled
+def create_composite(images=None, count=None, size=None, output_dir="rankings"):
+    """
+    Build the whole composite image in memory.
+    
+    Args:
+        images (list): Cards for ranks 1 to `count`, missing entries are loaded from `output_dir`.
+        count (int): Number of top cards (defaults to `composite_ranks`).
+        size (tuple): (width, height) of the composite (defaults to `composite_size`).
+        output_dir (str): Folder missing cards are loaded from.
+        
+    Returns:
+        Image: The RGBA composite.
+    """
+    count = count if count is not None else composite_ranks
+    return next(composite_bands(images, count, size or composite_size, output_dir))
+
+
+def pyramid_file(output_dir, size):
+    """
+    Get the path of a level of the composite pyramid, e.g. `rankings/composite_1920x1080.png`.
+    
+    Args:
+        output_dir (str): Output folder.
+        size (tuple): (width, height) of the level.
+        
+    Returns:
+        str: Path of the level in the output format.
+    """
+    return output_file(output_dir, f"composite_{size[0]}x{size[1]}")
+
+
+def pyramid_source(levels, size):
+    """
+    Find the smallest built level that a pyramid level is a whole fraction of.
+    
+    Args:
+        levels (dict): Built levels, sizes mapped to the in-memory image or None.
+        size (tuple): (width, height) of the new level.
+        
+    Returns:
+        tuple: (image, factor) to reduce, or (None, None) if the level has to be laid out itself.
+    """
+    width, height = size
+    for (level_width, level_height), image in sorted(levels.items(), key=lambda level: level[0][0] * level[0][1]):
+        factor = level_width // width
+        if image is not None and factor > 1 and (level_width, level_height) == (width * factor, height * factor):
+            return image, factor
+    return None, None
+
+
+def _write_composite(output_path, images, count, size, output_dir, memory_budget):
+    # Build one composite in memory, or in bands when it does not fit the memory budget
+    comp_width, comp_height = size
+    row_bytes = comp_width * 4
+    if memory_budget is None or comp_height * row_bytes <= memory_budget // 2:
+        composite = create_composite(images, count, size, output_dir)
+        encode_image(composite, output_path)
+        return composite
+    
+    # Leave room for the logo and the largest resized card next to the band
+    largest_tile = max(width * height * 4 for x, y, width, height in composite_layout(count, comp_width, comp_height))
+    bg_logo = _scaled_logo(int(comp_width/2), 0.8)
+    logo_bytes = bg_logo.width * bg_logo.height * 4
+    band_height = max((memory_budget - logo_bytes - 2 * largest_tile) // row_bytes, 16)
+    bands = composite_bands(images, count, size, output_dir, band_height)
+    start = time.perf_counter()
+    save_png_in_bands(output_path, size, bands, output_options.get("compress_level", 6))
+    # The time includes building the bands, which happens while they are written
+    record_encode(output_path, time.perf_counter() - start)
+    profile_count("bytes encoded", os.path.getsize(output_path))
+    return None
+
+
+@profiled
+def compile_images(output_dir="rankings", images=None, count=None, size=None, memory_budget=None, pyramid=None):
+    """
+    Compile the top cards into one composite image, plus the other levels of the pyramid.
+    
+    When the whole composite does not fit in the memory budget, it is built and written in
+    horizontal bands, and each card is only loaded and resized while a band overlaps it.
+    Banded writing is only available for PNG output.
+    
+    Pyramid levels are built from the largest down. A level that is a whole fraction of a
+    level already in memory, such as 1920x1080 of 3840x2160, is reduced from it with a box
+    filter. Any other level is laid out at its own size from the same cards, which is cheaper
+    than downsampling a larger level with a high quality filter.
+    
+    Args:
+        output_dir (str): Folder the composite is saved to, and the cards are loaded from.
+        images (list): Cards for ranks 1 to `count` already in memory. Missing (None) entries are
+            loaded from `{output_dir}/{rank}` in the output format.
+        count (int): Number of top cards (defaults to `composite_ranks`).
+        size (tuple): (width, height) of the composite (defaults to `composite_size`).
+        memory_budget (int): Approximate bytes the composite may use, or None for no limit
+            (defaults to `composite_memory_budget`).
+        pyramid (list): Other (width, height) sizes to write as `composite_{width}x{height}`
+            (defaults to `composite_pyramid`).
+    """
+    count = count if count is not None else composite_ranks
+    size = tuple(size or composite_size)
+    if memory_budget is None:
+        memory_budget = composite_memory_budget
+    if pyramid is None:
+        pyramid = composite_pyramid
+    output_path = output_file(output_dir, "composite")
+    
+    if memory_budget is not None and output_format != "png":
+        print(f"The memory budget only applies to PNG output, building the {output_format} composite in memory")
+        memory_budget = None
+    levels = sorted({tuple(level) for level in pyramid} - {size}, key=lambda level: level[0] * level[1], reverse=True)
+    if levels and memory_budget is None:
+        # Every level is laid out from the same cards, so read the ones on disk only once
+        images = list(images or [])[:count]
+        images += [None] * (count - len(images))
+        images = [image if image is not None else open_card_file(output_dir, rank)
+                  for rank, image in enumerate(images, 1)]
+    
+    built = {size: _write_composite(output_path, images, count, size, output_dir, memory_budget)}
     
     # Save the composite image
-    composite.save('rankings/composite.png')
-    print("Composite image saved to: rankings/composite.png")
+    print(f"Composite image saved to: {output_path}")
+    
+    for level in levels:
+        level_path = pyramid_file(output_dir, level)
+        source, factor = pyramid_source(built, level)
+        if source is not None:
+            built[level] = source.reduce(factor)
+            profile_count("resizes")
+            encode_image(built[level], level_path)
+        else:
+            built[level] = _write_composite(level_path, images, count, level, output_dir, memory_budget)
+        print(f"Composite image saved to: {level_path}")
+
+
+def reveal_schedule(boxes, comp_height, fps):
+    """
+    Plan the reveal animation: the cards slide up from below the canvas one at a time, last rank first.
+    
+    Args:
+        boxes (list): (x, y, width, height) of every card, from composite_layout.
+        comp_height (int): Height of the canvas.
+        fps (int): Frames per second.
+        
+    Returns:
+        list: One (rank, y, length) step per distinct frame, where `y` is the top of the moving
+        card and `length` the number of frames the step is shown for. The first step
+        (rank None) shows the background on its own.
+    """
+    slide_frames = max(round(REVEAL_SLIDE_SECONDS * fps), 1)
+    steps = [(None, None, max(round(REVEAL_PAUSE_SECONDS * fps), 1))]
+    for rank in range(len(boxes), 0, -1):
+        target_y = boxes[rank - 1][1]
+        for frame in range(1, slide_frames + 1):
+            # Ease out, so the card slows down as it lands
+            progress = 1 - (1 - frame / slide_frames) ** 3
+            steps.append((rank, round(comp_height + (target_y - comp_height) * progress), 1))
+        steps[-1] = (rank, target_y, max(round(REVEAL_PAUSE_SECONDS * fps), 1))
+    steps[-1] = (steps[-1][0], steps[-1][1], max(round(REVEAL_FINAL_SECONDS * fps), 1))
+    return steps
+
+
+def reveal_frames(steps, background, boxes, tiles):
+    """
+    Render the frames of a reveal, redrawing only the regions that changed.
+    
+    Landed cards are pasted into a copy of the background once, and each frame only restores the
+    area the moving card left from it and pastes the card at its new position.
+    
+    Args:
+        steps (list): Result of reveal_schedule.
+        background (Image): Static layers of the composite, without any card.
+        boxes (list): (x, y, width, height) of every card.
+        tiles (dict): Cards resized to their boxes, keyed by rank.
+        
+    Yields:
+        tuple: (frame, box, length) with the frame (one canvas, changed in place after each step),
+        the (left, top, right, bottom) region that changed since the previous frame, and the
+        number of frames it is shown for.
+    """
+    width, height = background.size
+    settled = background.copy()
+    frame = background.copy()
+    moving = None
+    
+    for rank, y, length in steps:
+        if rank is None:
+            yield frame, (0, 0, width, height), length
+            continue
+        x, target_y, tile_width, tile_height = boxes[rank - 1]
+        dirty = [(x, y, x + tile_width, y + tile_height)]
+        if moving is not None:
+            frame.paste(settled.crop(moving), moving[:2])
+            dirty.append(moving)
+        frame.paste(tiles[rank], (x, y))
+        if y == target_y:
+            settled.paste(tiles[rank], (x, y))
+            moving = None
+        else:
+            moving = dirty[0]
+        
+        box = (max(min(box[0] for box in dirty), 0), max(min(box[1] for box in dirty), 0),
+               min(max(box[2] for box in dirty), width), min(max(box[3] for box in dirty), height))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            # Nothing visible changed, e.g. a card still below the canvas
+            box = (0, 0, 1, 1)
+        yield frame, box, length
+
+
+def save_apng(path, size, frames, frame_count, fps, compress_level=6):
+    """
+    Write an animated PNG frame by frame. Every frame after the first only stores the region
+    that changed, which replaces those pixels of the previous frame.
+    
+    Args:
+        path (str): Destination file.
+        size (tuple): (width, height) of the animation.
+        frames (iterable): (frame, box, length) tuples from reveal_frames.
+        frame_count (int): Number of tuples in `frames`.
+        fps (int): Frames per second.
+        compress_level (int): zlib compression level.
+    """
+    width, height = size
+    sequence = 0
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        # Loop forever
+        file.write(_png_chunk(b"acTL", struct.pack(">II", frame_count, 0)))
+        for index, (frame, box, length) in enumerate(frames):
+            region = frame.crop(box)
+            # No disposal, and the region replaces the pixels below it (alpha included)
+            file.write(_png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", sequence, region.width, region.height,
+                                                       box[0], box[1], length, fps, 0, 0)))
+            sequence += 1
+            data = zlib.compress(_png_rows(region), compress_level)
+            if index == 0:
+                file.write(_png_chunk(b"IDAT", data))
+            else:
+                file.write(_png_chunk(b"fdAT", struct.pack(">I", sequence) + data))
+                sequence += 1
+        file.write(_png_chunk(b"IEND", b""))
+
+
+def save_gif(path, frames, palette, fps):
+    """
+    Write an animated GIF frame by frame, storing only the region that changed in each frame.
+    
+    GIF has no partial transparency, and transparent pixels in a frame would leave the previous
+    frame's pixels visible, so frames are flattened over black.
+    
+    Args:
+        path (str): Destination file.
+        frames (iterable): (frame, box, length) tuples from reveal_frames.
+        palette (Image): "P" image whose palette every frame is mapped to.
+        fps (int): Frames per second.
+    """
+    shown = 0
+    elapsed = 0
+    with open(path, "wb") as file:
+        for index, (frame, box, length) in enumerate(frames):
+            region = frame.crop(box)
+            flat = Image.new("RGBA", region.size, (0, 0, 0, 255))
+            flat.alpha_composite(region)
+            indexed = flat.convert("RGB").quantize(palette=palette, dither=Image.Dither.NONE)
+            if index == 0:
+                file.writelines(GifImagePlugin.getheader(indexed, info={"loop": 0, "optimize": False})[0])
+            # GIF delays are in hundredths of a second, so carry the rounding over to the next frame
+            elapsed += length
+            duration = round(elapsed * 100 / fps) * 10 - shown
+            shown += duration
+            file.writelines(GifImagePlugin.getdata(indexed, offset=box[:2], duration=duration, disposal=1))
+        file.write(b";")
+
+
+def save_frame_sequence(folder, frames):
+    """
+    Write every frame of the animation as a numbered file in the output format, e.g. for a video editor.
+    
+    Frames are encoded on the background encoder threads, and frames that are shown for longer
+    than one frame are hard links to (or copies of) the same file.
+    
+    Args:
+        folder (str): Folder the frames are written to, replacing any earlier frames.
+        frames (iterable): (frame, box, length) tuples from reveal_frames.
+    """
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder)
+    
+    number = 0
+    encoding = deque()
+    repeats = []
+    for frame, box, length in frames:
+        number += 1
+        path = output_file(folder, f"{number:05d}")
+        encoding.append(submit_encode(frame.copy(), path))
+        while len(encoding) > 2 * max(encode_threads, 1):
+            result = encoding.popleft()
+            if isinstance(result, Future):
+                result.result()
+        for repeat in range(1, length):
+            repeats.append((path, output_file(folder, f"{number + repeat:05d}")))
+        number += length - 1
+    for result in encoding:
+        if isinstance(result, Future):
+            result.result()
+    
+    for source, path in repeats:
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+
+
+@profiled
+def create_reveal(output_dir="rankings", images=None, count=None, size=None, kind=None, fps=None):
+    """
+    Build an animation revealing the top cards one at a time, ending on the composite image.
+    
+    Args:
+        output_dir (str): Folder the animation is saved to, and missing cards are loaded from.
+        images (list): Cards for ranks 1 to `count`, missing entries are loaded from `output_dir`.
+        count (int): Number of top cards (defaults to `composite_ranks`).
+        size (tuple): (width, height) of the animation (defaults to `composite_size`).
+        kind (str): "apng", "gif" or "frames" (defaults to `reveal_format`).
+        fps (int): Frames per second (defaults to `reveal_fps`).
+        
+    Returns:
+        str: Path of the animation, or of the frame folder.
+    """
+    count = count if count is not None else composite_ranks
+    size = size or composite_size
+    kind = kind or reveal_format
+    fps = fps or reveal_fps
+    images = list(images or [])[:count]
+    images += [None] * (count - len(images))
+    
+    boxes = composite_layout(count, *size)
+    tiles = {}
+    for rank, (x, y, width, height) in enumerate(boxes, 1):
+        image = images[rank - 1]
+        if image is None:
+            image = Image.open(output_file(output_dir, rank))
+        tiles[rank] = resize_card(image, (width, height))
+        profile_count("resizes")
+    
+    background = Image.new('RGBA', size, (0, 0, 0, 0))
+    bg_logo = _scaled_logo(int(size[0]/2), 0.8)
+    _paste_composite_band(background, 0, bg_logo, (size[1] - bg_logo.height) // 2, [], tiles.get)
+    
+    steps = reveal_schedule(boxes, size[1], fps)
+    frames = reveal_frames(steps, background, boxes, tiles)
+    path = os.path.join(output_dir, REVEAL_FORMATS[kind])
+    start = time.perf_counter()
+    if kind == "apng":
+        save_apng(path, size, frames, len(steps), fps, output_options.get("compress_level", 6))
+    elif kind == "gif":
+        # Map every frame to the palette of the final composite; sliding cards have the same colors
+        final = background.copy()
+        for rank, (x, y, width, height) in enumerate(boxes, 1):
+            final.paste(tiles[rank], (x, y))
+        flat = Image.new("RGBA", size, (0, 0, 0, 255))
+        flat.alpha_composite(final)
+        save_gif(path, frames, flat.convert("RGB").quantize(256), fps)
+    else:
+        save_frame_sequence(path, frames)
+    
+    total_frames = sum(length for rank, y, length in steps)
+    print(f"Reveal animation saved to: {path} ({total_frames} frames, {len(steps)} rendered, "
+          f"{time.perf_counter() - start:.2f} s)")
+    return path
+
+
+def file_digest(path):
+    """
+    Compute the SHA-1 digest of a file, reusing the result while the file is unchanged.
+    
+    Args:
+        path (str): Path to the file.
+        
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        digest = _file_digest_cache.get(key)
+    if digest is None:
+        with open(path, "rb") as file:
+            digest = hashlib.sha1(file.read()).hexdigest()
+        with _cache_lock:
+            _file_digest_cache[key] = digest
+    return digest
+
+
+@profiled
+def build_card_layers(width, height):
+    """
+    Render the parts of a card that do not depend on the winner or the characters.
+    
+    Args:
+        width (int): Card width.
+        height (int): Card height.
+        
+    Returns:
+        tuple: (background, overlay, mask) where background holds the logo, blue square and
+        gradient, overlay holds the rectangles drawn over the characters and mask is the
+        rounded corner alpha mask.
+    """
+    background = Image.new('RGBA', (width, height), (0, 0, 0, 255))
+    logo = get_resized_logo(width, opacity=LOGO_OPACITY)
+    background.paste(logo, (0, (background.height - logo.height) // 2), logo)
+    background = paste_light_blue_square(background)
+    background = paste_gradient_on_canvas(background)
+    
+    # Rectangles go on a transparent layer so they can be pasted over the characters later
+    overlay = draw_rectangles_on_canvas(Image.new('RGBA', (width, height), (0, 0, 0, 0)))
+    
+    mask = generate_rounded_mask((width, height), radius=CARD_CORNER_RADIUS)
+    
+    return background, overlay, mask
+
+
+@profiled
+def get_card_layers(width, height, reduce_factor=1):
+    """
+    Get the static card layers, building them once per process.
+    
+    Layers are keyed by card size, logo contents and style parameters. When
+    `background_cache_dir` is set they are also saved to and loaded from disk. The lock is
+    only held to look up and insert layers; threads that miss at the same time each build
+    them and keep the first ones inserted.
+    
+    Args:
+        width (int): Card width.
+        height (int): Card height.
+        reduce_factor (int): Shrink the full-size layers by this factor, for previews.
+        
+    Returns:
+        tuple: Shared (background, overlay, mask) images. Copy before drawing on them.
+    """
+    key = (width, height, file_digest(LOGO_PATH), LOGO_OPACITY, CARD_CORNER_RADIUS, tuple(gradient_palette))
+    if reduce_factor > 1:
+        # Built from the full-size layers, as the layer geometry does not scale linearly with the card.
+        # Only whole blocks are reduced, so the layers are width // reduce_factor wide like the rest of the preview
+        with _cache_lock:
+            layers = _card_layer_cache.get(key + (reduce_factor,))
+        if layers is None:
+            box = (0, 0, width // reduce_factor * reduce_factor, height // reduce_factor * reduce_factor)
+            layers = tuple(layer.reduce(reduce_factor, box) for layer in get_card_layers(width, height))
+            with _cache_lock:
+                layers = _card_layer_cache.setdefault(key + (reduce_factor,), layers)
+        return layers
+    with _cache_lock:
+        layers = _card_layer_cache.get(key)
+    if layers is not None:
+        profile_count("card layer cache hits")
+        return layers
+    profile_count("card layer cache misses")
+    
+    layers = None
+    if background_cache_dir:
+        name = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        paths = [os.path.join(background_cache_dir, f"card_{width}x{height}_{name}_{part}.png")
+                 for part in ("background", "overlay", "mask")]
+        if all(os.path.exists(path) for path in paths):
+            layers = []
+            for path in paths:
+                with Image.open(path) as image:
+                    image.load()
+                    layers.append(image)
+            layers = tuple(layers)
+        else:
+            layers = build_card_layers(width, height)
+            os.makedirs(background_cache_dir, exist_ok=True)
+            for layer, path in zip(layers, paths):
+                save_image_atomic(layer, path)
+    else:
+        layers = build_card_layers(width, height)
+    
+    with _cache_lock:
+        return _card_layer_cache.setdefault(key, layers)
 
 
+@profiled
 def create_canvas(char1_image, char2_image, winner_name, rank_number):
     """
     Create a composite image canvas with fixed dimensions and various elements.
@@ -452,72 +1900,1270 @@ def create_canvas(char1_image, char2_image, winner_name, rank_number):
     Returns:
         Image: Composite canvas image.
     """
-    # Adjust the character image sizes to fit the new card dimensions
-    char1_image = char1_image.resize((fixed_width // 2, fixed_height), True)
-    char2_image = char2_image.resize((fixed_width // 2, fixed_height), True)
-    
-    # Create a canvas with fixed dimensions
-    canvas = Image.new('RGBA', (fixed_width, fixed_height), (0, 0, 0, 255))
-    
-    # Calculate the positions for logo and other elements
-    logo = get_resized_logo(fixed_width, opacity=0.5)  # 0.5 is 50% opacity
-    canvas.paste(logo, (0, (canvas.height - logo.height) // 2), logo) 
-    canvas = paste_light_blue_square(canvas)
-    canvas = paste_gradient_on_canvas(canvas)
-    canvas = paste_character_renders(canvas, char2_image, char1_image)
-    canvas = draw_rectangles_on_canvas(canvas)
-    canvas = draw_winner_info_on_canvas(canvas, winner_name, rank_number)
-    # Create a rounded rectangle mask
-    rounded_mask = generate_rounded_mask(canvas.size, radius=30)
+    # Previews are drawn at a fraction of the card size
+    width, height = fixed_width // preview_factor, fixed_height // preview_factor
+    scale = 1 / preview_factor
+    
+    # Adjust the character image sizes to fit the new card dimensions (a copy if they already fit)
+    char1_image = char1_image.resize((width // 2, height), True)
+    char2_image = char2_image.resize((width // 2, height), True)
+    profile_count("resizes", 2)
+    
+    # Start from a copy of the cached logo, blue square and gradient background
+    background, overlay, rounded_mask = get_card_layers(fixed_width, fixed_height, preview_factor)
+    canvas = background.copy()
+    
+    canvas = paste_character_renders(canvas, char2_image, char1_image, scale)
+    canvas.paste(overlay, (0, 0), overlay)
+    canvas = draw_winner_info_on_canvas(canvas, winner_name, rank_number, scale)
+    # Apply the rounded rectangle mask
     canvas.putalpha(rounded_mask)
 
     return canvas
 
 
-def main():
+def _blend_array(pixels, source, mask):
     """
-    Main function to create a series of composite images based on user input.
-    """
-    if os.path.exists("rankings"):
-        shutil.rmtree("rankings")
+    Blend a source into pixels in place, rounding exactly like Image.paste with a mask.
     
-    # Scan renders folder
-    character_files = os.listdir("renders")
-    available_characters = [os.path.splitext(file)[0] for file in character_files]
+    Opaque mask pixels are copied and transparent ones skipped, so only the partly
+    transparent edges are computed.
+    
+    Args:
+        pixels (ndarray): uint8 RGBA pixels, changed in place.
+        source (ndarray | tuple): uint8 RGBA pixels or color, broadcastable to pixels.
+        mask (ndarray): uint8 mask, broadcastable to pixels without the channel axis.
+    """
+    # Whole RGBA pixels are moved as single 32-bit values
+    packed = pixels.view(np.uint32)[..., 0]
+    source = np.broadcast_to(np.asarray(source, np.uint8), pixels.shape).view(np.uint32)[..., 0]
+    mask = np.broadcast_to(mask, packed.shape)
+    opaque = mask == 255
+    np.copyto(packed, source, where=opaque)
+    partial = (mask != 0) & ~opaque
+    if not partial.any():
+        return
+    alpha = mask[partial].astype(np.uint16)[:, None]
+    blended = (packed[partial].view(np.uint8).reshape(-1, 4) * (255 - alpha)
+               + source[partial].view(np.uint8).reshape(-1, 4) * alpha + 128)
+    packed[partial] = ((blended + (blended >> 8)) >> 8).astype(np.uint8).view(np.uint32)[:, 0]
 
-    # Create the "rankings" folder if it doesn't exist
-    if not os.path.exists("rankings"):
-        os.makedirs("rankings")
 
-    # Check if ranking.txt exists
-    if os.path.exists("ranking.txt"):
-        with open("ranking.txt", "r") as file:
-            lines = file.readlines()
-            for rank, line in enumerate(lines, 1):
-                winner_name, character1, character2 = map(str.strip, line.split(","))
-                
-                if character1 in ['ptx', 'gold'] and character2 == "blank":
-                    character2 = character1
-                    character1 = "blank"
-
-                char1_image, char2_image = get_character_images(character1, character2, fixed_width, fixed_height)
-                canvas = create_canvas(char1_image, char2_image, winner_name, rank)
-
-
-                # Save the resulting image to the "rankings" folder
-                output_filename = f"rankings/{rank}.png"
-                canvas.save(output_filename)
-                print(f"Image saved to: {output_filename}")
+def _stamp_mask_array(pixels, x, y, mask, offsets, color):
+    """
+    Stamp a mask in a color at several offsets, like repeated ImageDraw.bitmap calls.
+    
+    A pixel that any stamp covers fully ends up in the color whatever came before, so only the
+    antialiased edge pixels are blended one stamp after another.
+    
+    Args:
+        pixels (ndarray): RGBA pixels of one card, changed in place.
+        x (int): x-coordinate of the mask at offset (0, 0).
+        y (int): y-coordinate of the mask at offset (0, 0).
+        mask (ndarray): uint8 text mask.
+        offsets (list): (x, y) offsets in stamping order.
+        color (str | tuple): Color of the stamps.
+    """
+    color = ImageColor.getcolor(color, 'RGBA') if isinstance(color, str) else tuple(color) + (255,) * (4 - len(color))
+    min_x, min_y = min(offset[0] for offset in offsets), min(offset[1] for offset in offsets)
+    span_x, span_y = max(offset[0] for offset in offsets) - min_x, max(offset[1] for offset in offsets) - min_y
+    stamps = np.zeros((len(offsets), mask.shape[0] + span_y, mask.shape[1] + span_x), np.uint8)
+    for stamp, (offset_x, offset_y) in zip(stamps, offsets):
+        stamp[offset_y - min_y:offset_y - min_y + mask.shape[0], offset_x - min_x:offset_x - min_x + mask.shape[1]] = mask
+    
+    # Clip the stamps to the card, as ImageDraw does
+    left, top = x + min_x, y + min_y
+    x0, y0 = max(left, 0), max(top, 0)
+    x1, y1 = min(left + stamps.shape[2], pixels.shape[1]), min(top + stamps.shape[1], pixels.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    stamps = stamps[:, y0 - top:y1 - top, x0 - left:x1 - left]
+    region = pixels[y0:y1, x0:x1]
+    
+    if len(stamps) == 1:
+        _blend_array(region, color, stamps[0])
+        return
+    covered = (stamps == 255).any(axis=0)
+    edge = (stamps > 0).any(axis=0) & ~covered
+    edge_pixels = region[edge].astype(np.uint16)
+    color = np.array(color, np.uint16)
+    for alpha in stamps[:, edge].astype(np.uint16)[..., None]:
+        blended = edge_pixels * (255 - alpha) + color * alpha + 128
+        edge_pixels = (blended + (blended >> 8)) >> 8
+    region[edge] = edge_pixels
+    region[covered] = color
 
-    else:
-        # Loop to generate 8 composite images with rankings
-        for rank in range(8, 0, -1):
-            while True:  # Loop until valid characters are entered or user types 'END'
-                # Prompt user for input
-                winner_name = input(f"Enter the {ordinal_number(rank)} place winner's name (or type 'END' to exit): ")
 
-                if winner_name.upper() == "END":
-                    break
+def draw_text_with_effects_array(pixels, x, y, text, font, fill, outline, shadow, thickness=3, shadow_offset=(4, 4)):
+    """
+    Draw text with an outline and a drop shadow into an array, like draw_text_with_effects.
+    
+    Args:
+        pixels (ndarray): RGBA pixels of one card, changed in place.
+        x (int): x-coordinate of text position.
+        y (int): y-coordinate of text position.
+        text (str): Text to be drawn.
+        font (ImageFont): Font to be used.
+        fill (str | tuple): Text color.
+        outline (str | tuple): Outline color.
+        shadow (tuple): RGB tuple for shadow color, or None for no shadow.
+        thickness (int): Thickness of the outline.
+        shadow_offset (tuple): (x, y) offsets for the shadow.
+    """
+    mask, (left, top) = get_text_mask(text, font)
+    mask = np.asarray(mask)
+    x, y = x + left, y + top
+    
+    if shadow is not None:
+        _stamp_mask_array(pixels, x + shadow_offset[0], y + shadow_offset[1], mask, [(0, 0)], shadow)
+    offsets = [(offset_x, offset_y) for offset_x in range(-thickness, thickness + 1)
+               for offset_y in range(-thickness, thickness + 1)]
+    _stamp_mask_array(pixels, x, y, mask, offsets, outline)
+    _stamp_mask_array(pixels, x, y, mask, [(0, 0)], fill)
+
+
+def _render_array(image, width, height):
+    # Character render as RGBA pixels of the given size, resized the way create_canvas does
+    if image.size != (width, height):
+        image = image.resize((width, height), True)
+        profile_count("resizes")
+    if image.mode != 'RGBA':
+        # Pasted without a mask, which is the same as a blend with an opaque alpha
+        image = image.convert('RGBA')
+    return np.asarray(image)
+
+
+def _paste_array_batch(pixels, sprites, x):
+    # Blend one sprite per card at the same x position, clipped to the cards
+    x0, x1 = max(x, 0), min(x + sprites.shape[2], pixels.shape[2])
+    rows = min(sprites.shape[1], pixels.shape[1])
+    if x0 < x1:
+        sprites = sprites[:, :rows, x0 - x:x1 - x]
+        _blend_array(pixels[:, :rows, x0:x1], sprites, sprites[..., 3])
+
+
+@profiled
+def create_canvas_batch(cards):
+    """
+    Create several cards at once with NumPy, giving the same pixels as create_canvas.
+    
+    The cards start as copies of one background array. The character renders of the whole
+    batch are blended in two operations, and the rectangles and rounded corners in one each;
+    only the text is drawn card by card.
+    
+    Args:
+        cards (list): (char1_image, char2_image, winner_name, rank_number) tuples.
+    
+    Returns:
+        list: Composite canvas images, in the order of `cards`.
+    """
+    scale = 1 / preview_factor
+    background, overlay, rounded_mask = get_card_layers(fixed_width, fixed_height, preview_factor)
+    width, height = background.size
+    
+    batch = np.empty((len(cards), height, width, 4), np.uint8)
+    batch[:] = np.asarray(background)
+    
+    # Character renders at the positions paste_character_renders uses, the second character on the left
+    margin = round(50 * scale)
+    _paste_array_batch(batch, np.stack([_render_array(card[1], width // 2, height) for card in cards]), margin)
+    _paste_array_batch(batch, np.stack([_render_array(card[0], width // 2, height) for card in cards]),
+                       width // 2 - margin)
+    
+    # The rectangles only cover the bottom of the card
+    left, top, right, bottom = overlay.getbbox() or (0, 0, 0, 0)
+    overlay_pixels = np.asarray(overlay)[top:bottom, left:right]
+    _blend_array(batch[:, top:bottom, left:right], overlay_pixels, overlay_pixels[..., 3])
+    
+    for card_pixels, (_, _, winner_name, rank_number) in zip(batch, cards):
+        for text in layout_winner_info(width, height, winner_name, rank_number, scale):
+            draw_text_with_effects_array(card_pixels, **text)
+    
+    batch[..., 3] = np.asarray(rounded_mask)
+    return [Image.fromarray(card) for card in batch]
+
+
+def save_image_atomic(image, path, format="PNG", **params):
+    """
+    Save an image through a temporary file so concurrent readers never see a partial file.
+    
+    Args:
+        image (Image): Image to save.
+        path (str): Destination path.
+        format (str): Pillow format name.
+        **params: Extra keyword arguments passed to Image.save.
+    """
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(temp_path, format=format, **params)
+    profile_count("bytes encoded", os.path.getsize(temp_path))
+    os.replace(temp_path, path)
+
+
+# Encode time and bytes written per output format, and the background encoder threads
+_encode_lock = threading.Lock()
+_encode_stats = {}
+_encode_pool = None
+
+
+def output_file(output_dir, name):
+    """
+    Get the path of an output file in the current output format.
+    
+    Args:
+        output_dir (str): Output folder.
+        name (int | str): File name without the extension, a rank or "composite".
+        
+    Returns:
+        str: Path such as `rankings/1.png`.
+    """
+    return f"{output_dir}/{name}{OUTPUT_FORMATS[output_format][1]}"
+
+
+def record_encode(path, seconds):
+    """
+    Add an encoded file to the encode report.
+    
+    Args:
+        path (str): The written file.
+        seconds (float): Time spent encoding it.
+    """
+    with _encode_lock:
+        stats = _encode_stats.setdefault(output_format, {"files": 0, "seconds": 0.0, "bytes": 0})
+        stats["files"] += 1
+        stats["seconds"] += seconds
+        stats["bytes"] += os.path.getsize(path)
+
+
+@profiled
+def encode_image(image, path):
+    """
+    Save an image in the current output format with the current encoder options.
+    
+    Args:
+        image (Image): Image to save.
+        path (str): Destination path, see output_file.
+        
+    Returns:
+        str: The path.
+    """
+    start = time.perf_counter()
+    save_image_atomic(image, path, OUTPUT_FORMATS[output_format][0], **output_options)
+    record_encode(path, time.perf_counter() - start)
+    return path
+
+
+@synchronized
+def _get_encode_pool():
+    global _encode_pool
+    if _encode_pool is None:
+        _encode_pool = ThreadPoolExecutor(max_workers=encode_threads, thread_name_prefix="encode")
+    return _encode_pool
+
+
+def submit_encode(image, path):
+    """
+    Encode an image on the background encoder threads, so the next card is rendered meanwhile.
+    
+    The image must not be changed afterwards. Worker processes and `encode_threads` 0 encode
+    right away instead.
+    
+    Args:
+        image (Image): Image to save.
+        path (str): Destination path.
+        
+    Returns:
+        Future: Resolves to the path once the file is written, or the path itself when encoded right away.
+    """
+    if encode_threads <= 0 or _worker_process:
+        return encode_image(image, path)
+    return _get_encode_pool().submit(encode_image, image, path)
+
+
+def drain_encode_stats():
+    """
+    Take the encode report recorded so far and reset it, e.g. to send it from a worker process.
+    
+    Returns:
+        dict: Files, seconds and bytes per output format.
+    """
+    global _encode_stats
+    with _encode_lock:
+        stats, _encode_stats = _encode_stats, {}
+    return stats
+
+
+def merge_encode_stats(stats):
+    """
+    Add an encode report drained from a worker to this process's totals.
+    
+    Args:
+        stats (dict): Result of drain_encode_stats.
+    """
+    with _encode_lock:
+        for name, values in stats.items():
+            totals = _encode_stats.setdefault(name, {"files": 0, "seconds": 0.0, "bytes": 0})
+            for field in totals:
+                totals[field] += values[field]
+
+
+def print_encode_report():
+    """
+    Print the number of files, encode time and bytes written per output format.
+    """
+    for name, stats in sorted(_encode_stats.items()):
+        print(f"Encoded {stats['files']} {name} files in {stats['seconds']:.2f} s, "
+              f"{stats['bytes'] / (1024 * 1024):.2f} MB written "
+              f"({stats['bytes'] / stats['files'] / 1024:.1f} KB per file)")
+
+
+def read_ranking(path):
+    """
+    Read a ranking file lazily, one line at a time.
+    
+    Args:
+        path (str): Ranking file, e.g. `ranking.txt`.
+        
+    Yields:
+        str: Each line of the file.
+    """
+    with open(path, "r") as file:
+        yield from file
+
+
+def parse_ranking_line(line):
+    """
+    Split a ranking.txt line into the winner's name and the two characters.
+    
+    Solo `ptx` or `gold` entries paired with `blank` are swapped so the blank render goes first.
+    
+    Args:
+        line (str): Line in the format `Winner Name, Character1, Character2`.
+        
+    Returns:
+        tuple: (winner_name, character1, character2).
+        
+    Raises:
+        ValueError: If the line does not have three fields.
+    """
+    fields = [field.strip() for field in line.split(",")]
+    if len(fields) != 3:
+        raise ValueError(f"expected 'Winner Name, Character1, Character2', got {line.strip()!r}")
+    winner_name, character1, character2 = fields
+    
+    if character1.lower() in ['ptx', 'gold'] and character2.lower() == "blank":
+        character2 = character1
+        character1 = "blank"
+    
+    return winner_name, character1, character2
+
+
+def validate_ranking(lines):
+    """
+    Check every ranking line against the roster before anything is rendered.
+    
+    Args:
+        lines (list): Lines from ranking.txt, ranked in order.
+        
+    Returns:
+        dict: Ranks of the invalid lines mapped to a ValueError describing the problem.
+    """
+    get_roster(refresh=True)
+    errors = {}
+    for rank, line in enumerate(lines, 1):
+        try:
+            winner_name, character1, character2 = parse_ranking_line(line)
+            check_character(character1)
+            check_character(character2)
+        except ValueError as error:
+            errors[rank] = error
+    return errors
+
+
+@profiled
+def render_card(rank, winner_name, character1, character2):
+    """
+    Render one ranking card.
+    
+    Args:
+        rank (int): The rank/position of the winner.
+        winner_name (str): Name of the winner.
+        character1 (str): Name of the first character.
+        character2 (str): Name of the second character.
+        
+    Returns:
+        Image: The card.
+    """
+    return create_canvas(*load_card(rank, winner_name, character1, character2))
+
+
+def load_card(rank, winner_name, character1, character2):
+    """
+    Load both character renders of a card at the size create_canvas draws them.
+    
+    Args:
+        rank (int): The rank/position of the winner.
+        winner_name (str): Name of the winner.
+        character1 (str): Name of the first character.
+        character2 (str): Name of the second character.
+        
+    Returns:
+        tuple: Arguments of create_canvas, (char1_image, char2_image, winner_name, rank).
+    """
+    card_size = (fixed_width // preview_factor // 2, fixed_height // preview_factor)
+    char1_image, char2_image = get_character_images(character1, character2, fixed_width, fixed_height, card_size=card_size)
+    return char1_image, char2_image, winner_name, rank
+
+
+@profiled
+def save_card(canvas, rank, output_dir="rankings", background=False):
+    """
+    Save a card as `{output_dir}/{rank}` in the output format, e.g. `rankings/1.png`.
+    
+    Args:
+        canvas (Image): The card.
+        rank (int): The rank/position of the winner.
+        output_dir (str): Folder the card is saved to.
+        background (bool): Encode on the background encoder threads and return a future.
+        
+    Returns:
+        str | Future: Path of the saved card, or a future resolving to it.
+    """
+    output_filename = output_file(output_dir, rank)
+    if background:
+        return submit_encode(canvas, output_filename)
+    return encode_image(canvas, output_filename)
+
+
+def _load_ranking_line(rank, line, output_dir, write_card, keep_image):
+    return load_card(rank, *parse_ranking_line(line))
+
+
+def _render_ranking_line(rank, line, output_dir, write_card, keep_image, card=None):
+    # The renders may already have been loaded by the decode stage of the pipeline
+    canvas = create_canvas(*card) if card else render_card(rank, *parse_ranking_line(line))
+    output_filename = save_card(canvas, rank, output_dir, background=True) if write_card else None
+    # Worker processes hand their profiling data and encode report back with each card
+    profile = drain_profile() if _worker_process and profiling_enabled else None
+    encoded = drain_encode_stats() if _worker_process else None
+    return output_filename, canvas if keep_image else None, profile, encoded
+
+
+def _load_ranking_batch(jobs):
+    """
+    Load the character renders of a batch of ranking lines.
+    
+    Args:
+        jobs (list): Arguments of _render_ranking_line, one tuple per line.
+        
+    Returns:
+        tuple: (cards, failed) where cards lists the create_canvas arguments of the lines that
+        loaded and failed maps the ranks of the other lines to their exception.
+    """
+    failed = {}
+    cards = []
+    for rank, line, output_dir, write_card, keep_image in jobs:
+        try:
+            cards.append(load_card(rank, *parse_ranking_line(line)))
+        except Exception as error:
+            failed[rank] = error
+    return cards, failed
+
+
+def _render_ranking_batch(jobs, loaded=None):
+    """
+    Render a batch of ranking lines at once with the NumPy backend and save the cards.
+    
+    Args:
+        jobs (list): Arguments of _render_ranking_line, one tuple per line.
+        loaded (tuple): What _load_ranking_batch returns for the jobs, if the renders are already loaded.
+        
+    Returns:
+        tuple: (outcomes, profile, encoded) where outcomes lists (rank, result) pairs in the order
+        of the jobs, result being what _render_ranking_line returns or the exception of a failed line.
+    """
+    cards, failed = _load_ranking_batch(jobs) if loaded is None else loaded
+    try:
+        canvases = dict(zip([card[3] for card in cards], create_canvas_batch(cards) if cards else []))
+    except Exception as error:
+        canvases = {}
+        failed.update((card[3], error) for card in cards)
+    
+    outcomes = []
+    for rank, line, output_dir, write_card, keep_image in jobs:
+        if rank in failed:
+            outcomes.append((rank, failed[rank]))
+            continue
+        canvas = canvases[rank]
+        output_filename = save_card(canvas, rank, output_dir, background=True) if write_card else None
+        outcomes.append((rank, (output_filename, canvas if keep_image else None, None, None)))
+    
+    # Worker processes hand their profiling data and encode report back once per batch
+    profile = drain_profile() if _worker_process and profiling_enabled else None
+    encoded = drain_encode_stats() if _worker_process else None
+    return outcomes, profile, encoded
+
+
+# Module settings changed from the command line that worker processes need to inherit
+WORKER_SETTINGS = ("background_cache_dir", "render_cache_dir", "gradient_palette", "profiling_enabled",
+                   "output_format", "output_options", "preview_factor", "compositing_backend")
+
+
+def _init_worker(settings):
+    # Worker processes may be spawned rather than forked, so carry over the settings
+    global _worker_process
+    globals().update(settings)
+    _worker_process = True
+    # A forked worker starts with a copy of the parent's profile and encode report, which are not its own
+    drain_profile()
+    drain_encode_stats()
+
+
+def create_pool(workers, executor="process"):
+    """
+    Create a pool of worker processes or threads for rendering cards.
+    
+    Args:
+        workers (int): Number of workers.
+        executor (str): "process" or "thread".
+        
+    Returns:
+        Executor: The pool. Worker processes start with this process's cache and profiling settings.
+    """
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=({name: globals()[name] for name in WORKER_SETTINGS},))
+
+
+def pipeline_stage(function, items, depth=PIPELINE_DEPTH):
+    """
+    Run a stage of the render pipeline on a background thread, at most `depth` items ahead of its consumer.
+    
+    The stage thread pulls the items lazily and hands each result over through a bounded
+    queue, so a slow consumer holds the stage back instead of letting results pile up.
+    
+    Args:
+        function (callable): Stage applied to every item.
+        items (iterable): Items to process, read only by the stage thread.
+        depth (int): Maximum number of finished results waiting for the consumer.
+        
+    Yields:
+        tuple: (item, result, error) in the order of the items, where error is the exception
+        the stage raised for that item, or None.
+    """
+    results = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    finished = object()
+    
+    def put(value):
+        # Give up once the consumer has stopped listening
+        while not stop.is_set():
+            try:
+                results.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def run():
+        failure = None
+        try:
+            for item in items:
+                try:
+                    value = (item, function(item), None)
+                except Exception as error:
+                    value = (item, None, error)
+                if not put(value):
+                    return
+        except Exception as error:
+            # Reading the items failed, e.g. the ranking file could not be read
+            failure = error
+        put((finished, failure, None))
+    
+    thread = threading.Thread(target=run, name="pipeline-stage", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, result, error = results.get()
+            if item is finished:
+                if result is not None:
+                    raise result
+                return
+            yield item, result, error
+    finally:
+        stop.set()
+        thread.join()
+
+
+def render_ranking_lines(lines, output_dir="rankings", workers=1, executor="process", ranks=None,
+                         write_cards=True, keep_ranks=(), pool=None):
+    """
+    Render a card for every ranking line, optionally on a pool of worker processes or threads.
+    
+    A failing line does not stop the others; its error is reported and returned.
+    
+    Args:
+        lines (list): Lines from ranking.txt, ranked in order.
+        output_dir (str): Folder the cards are saved to.
+        workers (int): Number of cards rendered at the same time. 1 renders serially.
+        executor (str): "process" or "thread" pool when workers is greater than 1.
+        ranks (list): Ranks to render, defaults to every line.
+        write_cards (bool): Save each card as `{output_dir}/{rank}` in the output format.
+        keep_ranks (iterable): Ranks whose card images are returned in memory, e.g. for the composite.
+        pool (Executor): Existing pool to render on, kept open. Overrides executor, and workers
+            only sets how the NumPy backend splits its batches.
+        
+    Returns:
+        tuple: (images, errors) where images maps the kept ranks to their cards and
+        errors maps the ranks of failed lines to their exception.
+    """
+    if ranks is None:
+        ranks = range(1, len(lines) + 1)
+    keep_ranks = set(keep_ranks)
+    jobs = ((rank, lines[rank - 1], output_dir, write_cards, rank in keep_ranks) for rank in ranks)
+    
+    images = {}
+    errors = {}
+    # Cards still being encoded in the background, bounded so rendering cannot run far ahead
+    encoding = deque()
+    
+    def fail(rank, error):
+        errors[rank] = error
+        print(f"Line {rank} failed: {type(error).__name__}: {error}")
+    
+    def saved(rank, output_filename):
+        try:
+            output_filename = output_filename.result()
+        except Exception as error:
+            fail(rank, error)
+            return
+        print(f"Image saved to: {output_filename}")
+    
+    def collect(rank, result):
+        try:
+            output_filename, canvas, profile, encoded = result()
+        except Exception as error:
+            fail(rank, error)
+            return
+        if profile is not None:
+            merge_profile(profile)
+        if encoded is not None:
+            merge_encode_stats(encoded)
+        if canvas is not None:
+            images[rank] = canvas
+        if isinstance(output_filename, Future):
+            encoding.append((rank, output_filename))
+            while len(encoding) > 2 * max(encode_threads, 1):
+                saved(*encoding.popleft())
+        elif output_filename:
+            print(f"Image saved to: {output_filename}")
+        else:
+            print(f"Card {rank} rendered")
+    
+    def collect_batch(batch, result):
+        try:
+            outcomes, profile, encoded = result()
+        except Exception as error:
+            for job in batch:
+                fail(job[0], error)
+            return
+        if profile is not None:
+            merge_profile(profile)
+        if encoded is not None:
+            merge_encode_stats(encoded)
+        for rank, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                fail(rank, outcome)
+            else:
+                collect(rank, lambda outcome=outcome: outcome)
+    
+    def raise_error(error):
+        raise error
+    
+    if compositing_backend == "numpy":
+        # Batches of up to NUMPY_BATCH_SIZE lines, split so that every worker gets one
+        size = max(1, min(NUMPY_BATCH_SIZE, -(-len(ranks) // max(workers, 1))))
+        batches = iter(lambda: list(itertools.islice(jobs, size)), [])
+        tasks = ((functools.partial(collect_batch, batch), _render_ranking_batch, (batch,)) for batch in batches)
+        load, depth = _load_ranking_batch, max(PIPELINE_DEPTH // size, 1)
+    else:
+        tasks = ((functools.partial(collect, job[0]), _render_ranking_line, job) for job in jobs)
+        load, depth = _load_ranking_line, PIPELINE_DEPTH
+    
+    if pool is None and workers <= 1:
+        # Pipeline: the renders of the next lines are decoded on a background thread while this
+        # card is composed, and finished cards are encoded on the encoder threads
+        for (handle, function, arguments), loaded, error in pipeline_stage(lambda task: load(*task[2]), tasks, depth):
+            handle(functools.partial(raise_error, error) if error else functools.partial(function, *arguments, loaded))
+    else:
+        owns_pool = pool is None
+        if owns_pool:
+            pool = create_pool(workers, executor)
+        try:
+            futures = [(handle, pool.submit(function, *arguments)) for handle, function, arguments in tasks]
+            for handle, future in futures:
+                handle(future.result)
+        finally:
+            if owns_pool:
+                pool.shutdown()
+    
+    while encoding:
+        saved(*encoding.popleft())
+    return images, errors
+
+
+def layout_parameters():
+    """
+    Get the settings that affect the pixels of every card.
+    
+    The composite's rank count and size are recorded in the composite's own manifest
+    entry, so changing them does not re-render the cards.
+    
+    Returns:
+        dict: Card size, style parameters and a digest of this script.
+    """
+    parameters = {
+        "card_size": [fixed_width, fixed_height],
+        "logo_opacity": LOGO_OPACITY,
+        "corner_radius": CARD_CORNER_RADIUS,
+        "palette": [list(color) for color in gradient_palette],
+        "code": file_digest(os.path.abspath(__file__)),
+    }
+    if preview_factor > 1:
+        parameters["preview"] = preview_factor
+    return parameters
+
+
+def output_settings():
+    """
+    Get the settings that affect the bytes of the written files but not their pixels.
+    
+    Returns:
+        dict: Output format and encoder options.
+    """
+    return {"format": output_format, "options": output_options}
+
+
+def _digest_json(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+@profiled
+def card_fingerprint(line):
+    """
+    Describe every input a card is rendered from.
+    
+    Args:
+        line (str): Line from ranking.txt.
+        
+    Returns:
+        dict: Hashes of the line, render files, font, logo and layout, the output settings, plus a combined `key`.
+        The key is None if an input is missing, so the line is always re-rendered.
+    """
+    entry = {"line": hashlib.sha1(line.strip().encode()).hexdigest()}
+    try:
+        winner_name, character1, character2 = parse_ranking_line(line)
+        entry["renders"] = {path: file_digest(path) for path in (render_path(character1), render_path(character2))}
+        entry["font"] = file_digest(GENERAL_FONT_PATH)
+        entry["logo"] = file_digest(LOGO_PATH)
+        entry["layout"] = layout_parameters()
+        entry["output"] = output_settings()
+    except (ValueError, OSError):
+        entry["key"] = None
+        return entry
+    entry["key"] = _digest_json(entry)
+    return entry
+
+
+def load_manifest(output_dir):
+    """
+    Load the build manifest stored next to the outputs.
+    
+    Args:
+        output_dir (str): Output folder.
+        
+    Returns:
+        dict: Manifest with `cards` (keyed by rank) and `composite` entries, empty if there is none.
+    """
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    try:
+        with open(path, "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {"cards": {}, "composite": None}
+    manifest.setdefault("cards", {})
+    manifest.setdefault("composite", None)
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    """
+    Write the build manifest next to the outputs.
+    
+    Args:
+        output_dir (str): Output folder.
+        manifest (dict): Manifest to save.
+    """
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(path, "w") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+
+@profiled
+def build_rankings(lines, output_dir="rankings", workers=1, executor="process", force=False, write_cards=True,
+                   pool=None):
+    """
+    Bring the cards and the composite in `output_dir` up to date with the ranking lines.
+    
+    The whole ranking is validated against the roster first, and nothing is rendered if a
+    line is invalid. Only cards whose inputs changed since the last run (according to the
+    manifest) are re-rendered, and the composite and the reveal animation are rebuilt only if
+    one of their cards or the logo changed.
+    
+    Args:
+        lines (iterable): Lines from ranking.txt, ranked in order, e.g. from read_ranking.
+        output_dir (str): Output folder.
+        workers (int): Number of cards rendered at the same time.
+        executor (str): "process" or "thread" pool when workers is greater than 1.
+        force (bool): Ignore the manifest and rebuild everything.
+        write_cards (bool): Save the individual cards. When False only the cards of the
+            composite are rendered, in memory, and only the composite is written.
+        pool (Executor): Existing pool to render on, e.g. shared by a batch.
+        
+    Returns:
+        tuple: (rendered, errors) with the number of cards rendered and the errors keyed by
+        rank for the lines that failed, or by 0 for an empty ranking.
+    """
+    # Every line is validated before the first card is rendered, so the lines are read in full here
+    lines = list(lines)
+    errors = validate_ranking(lines)
+    if errors:
+        for rank, error in errors.items():
+            print(f"Line {rank} is invalid: {error}")
+        print("Nothing was rendered, fix the ranking and run again")
+        return 0, errors
+    # Nothing to build, and the cleanup below would remove every earlier output
+    if not lines:
+        print("Ranking is empty, nothing was rendered")
+        return 0, {0: ValueError("ranking is empty")}
+    
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {"cards": {}, "composite": None} if force or not write_cards else load_manifest(output_dir)
+    
+    # A ranking shorter than --top fills the composite with all of its cards
+    count = min(composite_ranks, len(lines))
+    
+    fingerprints = {rank: card_fingerprint(line) for rank, line in enumerate(lines, 1)}
+    stale = [rank for rank, entry in fingerprints.items()
+             if entry["key"] is None
+             or manifest["cards"].get(str(rank)) != entry
+             or not os.path.exists(output_file(output_dir, rank))]
+    # Without card files only the cards of the composite and the reveal are of any use
+    if not write_cards:
+        stale = [rank for rank in stale if rank <= count]
+    
+    # Drop cards of ranks that are no longer in the ranking, pyramid levels no longer asked for,
+    # and outputs left from another format
+    extensions = {extension for name, extension in OUTPUT_FORMATS.values()}
+    levels = {f"composite_{width}x{height}" for width, height in composite_pyramid}
+    for name in os.listdir(output_dir) if write_cards else ():
+        stem, extension = os.path.splitext(name)
+        if extension not in extensions or not (stem.isdigit() or stem == "composite" or stem.startswith("composite_")):
+            continue
+        if (extension != OUTPUT_FORMATS[output_format][1] or stem.isdigit() and int(stem) > len(lines)
+                or stem.startswith("composite_") and stem not in levels):
+            os.remove(os.path.join(output_dir, name))
+    # Animations left from another --reveal format
+    for kind, name in REVEAL_FORMATS.items() if reveal_format else ():
+        path = os.path.join(output_dir, name)
+        if kind == reveal_format or not os.path.lexists(path):
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    
+    # Under a memory budget the composite loads the written cards lazily instead of keeping them all
+    keep_ranks = range(1, count + 1)
+    if composite_memory_budget is not None and write_cards:
+        keep_ranks = ()
+    
+    print(f"{len(stale)} of {len(lines)} cards need rendering")
+    images, errors = render_ranking_lines(lines, output_dir, workers=workers, executor=executor, ranks=stale,
+                                          write_cards=write_cards, keep_ranks=keep_ranks,
+                                          pool=pool)
+    rendered = len(stale) - len(errors)
+    
+    # Cards that were not written cannot be reused by the next run
+    manifest["cards"] = {str(rank): entry for rank, entry in fingerprints.items()
+                         if rank not in errors and write_cards}
+    if errors:
+        manifest["composite"] = None
+        save_manifest(output_dir, manifest)
+        return rendered, errors
+    
+    composite_entry = {
+        "cards": [fingerprints[rank]["key"] for rank in range(1, count + 1)],
+        "ranks": count,
+        "size": list(composite_size),
+        "logo": file_digest(LOGO_PATH),
+        "layout": layout_parameters(),
+        "output": output_settings(),
+    }
+    if composite_pyramid:
+        composite_entry["pyramid"] = [list(level) for level in composite_pyramid]
+    composite_paths = [output_file(output_dir, "composite")]
+    composite_paths += [pyramid_file(output_dir, level) for level in composite_pyramid if tuple(level) != tuple(composite_size)]
+    if manifest["composite"] != composite_entry or not all(os.path.exists(path) for path in composite_paths):
+        # Never leave a composite of outdated cards behind if compiling fails
+        for path in composite_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        compile_images(output_dir, images=[images.get(rank) for rank in range(1, count + 1)], count=count)
+    else:
+        print("Composite image is up to date")
+    manifest["composite"] = composite_entry
+    
+    if reveal_format:
+        reveal_entry = {"composite": composite_entry, "format": reveal_format, "fps": reveal_fps}
+        if manifest.get("reveal") != reveal_entry or not os.path.exists(os.path.join(output_dir, REVEAL_FORMATS[reveal_format])):
+            save_manifest(output_dir, dict(manifest, reveal=None))
+            create_reveal(output_dir, images=[images.get(rank) for rank in range(1, count + 1)], count=count)
+        else:
+            print("Reveal animation is up to date")
+        manifest["reveal"] = reveal_entry
+    save_manifest(output_dir, manifest)
+    return rendered, errors
+
+
+def find_ranking_files(paths):
+    """
+    Expand directories into the ranking files they contain.
+    
+    Args:
+        paths (list): Ranking files and directories of `.txt` ranking files.
+        
+    Returns:
+        list: Ranking file paths.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".txt")))
+        else:
+            files.append(path)
+    return files
+
+
+@profiled
+def build_batch(paths, output_root="rankings", workers=1, executor="process", force=False, write_cards=True):
+    """
+    Build the cards and composites of many ranking files in one process.
+    
+    Fonts, the logo, background layers and character renders are loaded once and shared by the
+    whole batch, as is the worker pool. Each ranking file gets its own output folder named after it.
+    
+    Args:
+        paths (list): Ranking files and directories of `.txt` ranking files.
+        output_root (str): Folder the per-file output folders are created in.
+        workers (int): Number of cards rendered at the same time.
+        executor (str): "process" or "thread" pool when workers is greater than 1.
+        force (bool): Ignore the manifests and rebuild everything.
+        write_cards (bool): Save the individual cards as well as the composites.
+        
+    Returns:
+        dict: Failed ranking files mapped to a description of what went wrong.
+    """
+    files = find_ranking_files(paths)
+    failures = {}
+    used_names = set()
+    total_cards = 0
+    start = time.perf_counter()
+    
+    pool = create_pool(workers, executor) if workers > 1 else None
+    try:
+        for path in files:
+            name = os.path.splitext(os.path.basename(path))[0]
+            suffix = 2
+            while name in used_names:
+                name = f"{os.path.splitext(os.path.basename(path))[0]}-{suffix}"
+                suffix += 1
+            used_names.add(name)
+            output_dir = os.path.join(output_root, name)
+            
+            print(f"Building {path} into {output_dir}")
+            file_start = time.perf_counter()
+            try:
+                lines = list(read_ranking(path))
+                rendered, errors = build_rankings(lines, output_dir, workers=workers, force=force,
+                                                  write_cards=write_cards, pool=pool)
+            except Exception as error:
+                failures[path] = f"{type(error).__name__}: {error}"
+                print(f"{path} failed: {failures[path]}")
+                continue
+            total_cards += rendered
+            elapsed = time.perf_counter() - file_start
+            print(f"{path}: {rendered} cards in {elapsed:.2f} s")
+            if errors:
+                failures[path] = f"{len(errors)} of {len(lines)} cards failed" if lines else "ranking is empty"
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    elapsed = time.perf_counter() - start
+    print(f"Batch of {len(files)} ranking files: {total_cards} cards in {elapsed:.2f} s "
+          f"({total_cards / elapsed if elapsed else 0:.1f} cards/s)")
+    for path, failure in failures.items():
+        print(f"Failed: {path} ({failure})")
+    return failures
+
+
+def parse_palette(value):
+    """
+    Parse a comma separated list of colors into a gradient palette.
+    
+    Args:
+        value (str): Colors in any format PIL understands, e.g. '#ff6666,skyblue'.
+        
+    Returns:
+        tuple: RGB tuples.
+    """
+    try:
+        return tuple(ImageColor.getrgb(color.strip())[:3] for color in value.split(","))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def parse_size(value):
+    """
+    Parse a WIDTHxHEIGHT size such as 3840x2160.
+    
+    Args:
+        value (str): Size to parse.
+        
+    Returns:
+        tuple: (width, height).
+    """
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive, got {value!r}")
+    return width, height
+
+
+def parse_sizes(value):
+    """
+    Parse a comma separated list of WIDTHxHEIGHT sizes.
+    
+    Args:
+        value (str): Sizes to parse, e.g. "1920x1080,480x270".
+        
+    Returns:
+        tuple: (width, height) tuples.
+    """
+    return tuple(parse_size(size.strip()) for size in value.split(",") if size.strip())
+
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    
+    Args:
+        argv (list): Arguments to parse (defaults to sys.argv).
+        
+    Returns:
+        argparse.Namespace: Parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Generate character ranking cards and the top 8 composite.")
+    parser.add_argument("--cache-backgrounds", action="store_true",
+                        help=f"Save the static card background layers under {CACHE_DIR}/backgrounds and reuse them between runs.")
+    parser.add_argument("--render-cache", choices=["warm", "purge"],
+                        help="Pre-resize every character render into the render cache, or delete the cache, then exit.")
+    parser.add_argument("--no-render-cache", action="store_true",
+                        help="Do not read or write pre-resized character renders on disk.")
+    parser.add_argument("--atlas", choices=["build", "remove"],
+                        help=f"Pack the trimmed character renders into {CACHE_DIR}/atlas.bin, or delete it, then exit.")
+    parser.add_argument("--palette", type=parse_palette,
+                        help="Comma separated gradient colors, e.g. '#ff6666,#66b2ff' (default pastel rainbow).")
+    parser.add_argument("--batch", nargs="+", metavar="PATH",
+                        help="Ranking files or directories of .txt ranking files to build in one process.")
+    parser.add_argument("--output", default="rankings",
+                        help="Folder for the batch outputs, one sub folder per ranking file (default rankings).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of cards rendered in parallel from ranking.txt (default 1, serial).")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process",
+                        help="Pool used when --workers is greater than 1 (default process).")
+    parser.add_argument("--backend", choices=COMPOSITING_BACKENDS, default="pillow",
+                        help=f"Build cards one at a time with Pillow, or {NUMPY_BATCH_SIZE} at a time in NumPy arrays. "
+                             "Both give the same pixels (default pillow).")
+    parser.add_argument("--no-card-files", action="store_true",
+                        help="Only write the composite image; cards are handed over in memory and not saved.")
+    parser.add_argument("--top", type=int, default=COMPOSITE_RANKS,
+                        help=f"Number of top ranks in the composite image (default {COMPOSITE_RANKS}).")
+    parser.add_argument("--composite-size", type=parse_size, default=COMPOSITE_SIZE, metavar="WIDTHxHEIGHT",
+                        help="Resolution of the composite image, e.g. 3840x2160 (default 1920x1080).")
+    parser.add_argument("--pyramid", type=parse_sizes, default=(), metavar="WIDTHxHEIGHT,...",
+                        help="Also write the composite at these sizes, e.g. 1920x1080,480x270, as composite_WIDTHxHEIGHT "
+                             "files built in the same run.")
+    parser.add_argument("--memory-budget", type=float, metavar="MB",
+                        help="Build the composite in horizontal bands so it stays within about this many megabytes.")
+    parser.add_argument("--preview", type=int, nargs="?", const=2, metavar="FACTOR",
+                        help="Draw quick previews at 1/FACTOR of the size (default 2) with cheaper filters and effects, "
+                             "and fast encoding. Leave out for final quality.")
+    parser.add_argument("--format", choices=sorted(OUTPUT_FORMATS), default="png",
+                        help="File format of the cards and the composite; WebP is lossless (default png).")
+    parser.add_argument("--encode-tier", choices=["fast", "default", "small"], default="default",
+                        help="Trade encode speed for file size (default keeps the format's standard settings).")
+    parser.add_argument("--compress-level", type=int, metavar="LEVEL",
+                        help="PNG zlib level (0-9) or WebP method (0-6), overriding the tier.")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Let the PNG encoder search for the smallest output (slow).")
+    parser.add_argument("--encode-threads", type=int, default=1,
+                        help="Threads encoding cards in the background while the next card renders; 0 encodes inline (default 1).")
+    parser.add_argument("--reveal", choices=sorted(REVEAL_FORMATS),
+                        help="Also build an animation revealing the top cards one at a time: an APNG, a GIF or numbered frames.")
+    parser.add_argument("--reveal-fps", type=int, default=REVEAL_FPS,
+                        help=f"Frame rate of the reveal animation (default {REVEAL_FPS}).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print the wall and CPU time per stage, bytes decoded and encoded, resizes and cache hits.")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write the stage timings as a Chrome trace JSON file (implies profiling).")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every card and the composite even if the manifest says they are up to date.")
+    args = parser.parse_args(argv)
+    
+    # WebP and QOI writers depend on how Pillow was built
+    Image.init()
+    if OUTPUT_FORMATS[args.format][0] not in Image.SAVE:
+        parser.error(f"this Pillow installation cannot write {args.format} files")
+    limits = {"png": 9, "webp": 6}
+    if args.compress_level is not None and not 0 <= args.compress_level <= limits.get(args.format, -1):
+        parser.error(f"--compress-level does not apply to {args.format} or is out of range")
+    if args.optimize and args.format != "png":
+        parser.error("--optimize only applies to png")
+    if args.reveal_fps <= 0:
+        parser.error("--reveal-fps must be positive")
+    if args.top < 1:
+        parser.error("--top must be at least 1")
+    if args.preview is not None and args.preview < 2:
+        parser.error("--preview FACTOR must be at least 2")
+    if args.backend == "numpy" and np is None:
+        parser.error("--backend numpy needs NumPy installed")
+    return args
+
+
+def main(argv=None):
+    """
+    Main function to create a series of composite images based on user input.
+    """
+    global profiling_enabled
+    args = parse_args(argv)
+    profiling_enabled = args.profile or bool(args.trace)
+    try:
+        return run(args)
+    finally:
+        print_encode_report()
+        if args.profile:
+            print_profile()
+        if args.trace:
+            write_trace(args.trace)
+            print(f"Trace saved to: {args.trace}")
+
+
+@profiled
+def run(args):
+    """
+    Generate the cards and the composite according to the parsed command line options.
+    
+    Args:
+        args (argparse.Namespace): Parsed options.
+        
+    Returns:
+        int: Exit status.
+    """
+    global background_cache_dir, render_cache_dir, gradient_palette
+    global composite_ranks, composite_size, composite_memory_budget, composite_pyramid
+    global output_format, output_options, encode_threads, reveal_format, reveal_fps, preview_factor
+    global compositing_backend
+    compositing_backend = args.backend
+    reveal_format = args.reveal
+    reveal_fps = args.reveal_fps
+    output_format = args.format
+    encode_tier = args.encode_tier
+    if args.preview:
+        preview_factor = args.preview
+        # Previews favour speed unless a tier was chosen explicitly
+        if encode_tier == "default":
+            encode_tier = "fast"
+    output_options = dict(ENCODE_TIERS[args.format][encode_tier])
+    if args.compress_level is not None:
+        output_options["compress_level" if args.format == "png" else "method"] = args.compress_level
+    if args.optimize:
+        output_options["optimize"] = True
+    encode_threads = args.encode_threads
+    composite_ranks = args.top
+    composite_size = (args.composite_size[0] // preview_factor, args.composite_size[1] // preview_factor)
+    composite_pyramid = tuple((width // preview_factor, height // preview_factor) for width, height in args.pyramid)
+    if args.memory_budget:
+        composite_memory_budget = int(args.memory_budget * 1024 * 1024)
+    if args.palette:
+        gradient_palette = args.palette
+    if args.cache_backgrounds:
+        background_cache_dir = os.path.join(CACHE_DIR, "backgrounds")
+    if args.no_render_cache:
+        render_cache_dir = None
+
+    if args.atlas == "build":
+        count = build_atlas()
+        print(f"Atlas of {count} sprites saved to: {atlas_path}")
+        return
+    if args.atlas == "remove":
+        remove_atlas()
+        print("Atlas removed")
+        return
+    if args.render_cache == "purge":
+        purge_render_cache()
+        print("Render cache purged")
+        return
+    if args.render_cache == "warm":
+        count = warm_render_cache(fixed_width, fixed_height)
+        print(f"Render cache warmed for {count} characters")
+        return
+
+    if args.batch:
+        failures = build_batch(args.batch, args.output, workers=args.workers, executor=args.executor,
+                               force=args.force, write_cards=not args.no_card_files)
+        return 1 if failures else 0
+
+    # Characters that have a render, from the roster index
+    available_characters = [name for name, entry in get_roster(refresh=True)["characters"].items() if entry is not None]
+
+    # Check if ranking.txt exists
+    if os.path.exists("ranking.txt"):
+        lines = list(read_ranking("ranking.txt"))
+        rendered, errors = build_rankings(lines, workers=args.workers, executor=args.executor, force=args.force,
+                                          write_cards=not args.no_card_files)
+        if errors:
+            if lines:
+                print(f"{len(errors)} of {len(lines)} cards failed, skipping the composite image")
+            return 1
+        return 0
+
+    else:
+        if os.path.exists("rankings"):
+            shutil.rmtree("rankings")
+        os.makedirs("rankings")
+
+        # Loop to generate 8 composite images with rankings
+        for rank in range(8, 0, -1):
+            while True:  # Loop until valid characters are entered or user types 'END'
+                # Prompt user for input
+                winner_name = input(f"Enter the {ordinal_number(rank)} place winner's name (or type 'END' to exit): ")
+
+                if winner_name.upper() == "END":
+                    break
 
                 character1 = input(f"Name of Character 1 (Choose from: {', '.join(available_characters)}): ").lower()
 
@@ -526,19 +3172,23 @@ def main():
                 else:
                     character2 = "blank"
 
-                char1_image, char2_image = get_character_images(character1, character2, fixed_width, fixed_height)
-                canvas = create_canvas(char1_image, char2_image, winner_name, rank)
-
+                try:
+                    check_character(character1)
+                    check_character(character2)
+                except ValueError as error:
+                    print(f"Invalid input: {error}")
+                    continue
 
-                # Save the resulting image to the "rankings" folder
-                output_filename = f"rankings/{rank}.png"
-                canvas.save(output_filename)
+                canvas = render_card(rank, winner_name, character1, character2)
+                output_filename = save_card(canvas, rank)
                 print(f"Image saved to: {output_filename}")
 
                 break  # Exit the while loop
 
-    # Compile the images into one composite image
-    compile_images()
+    # Compile the images into one composite image, of at most the 8 cards entered above
+    compile_images(count=min(composite_ranks, 8))
+    if reveal_format:
+        create_reveal(count=min(composite_ranks, 8))
 def ordinal_number(n):
     if 10 <= n % 100 <= 20:
         suffix = "th"
@@ -547,4 +3197,4 @@ def ordinal_number(n):
     return f"{n}{suffix}"
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
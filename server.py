@@ -0,0 +1,301 @@
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+
+# Largest composite width or height a request may ask for
+MAX_COMPOSITE_SIDE = 8192
+# Most ranking lines a request may send
+MAX_LINES = 1024
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of encoded responses, bounded by their total size in bytes.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a cached response body, or None if it is not cached.
+        """
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """
+        Cache a response body, evicting the least recently used ones to stay within max_bytes.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self.size -= len(self.entries.popitem(last=False)[1])
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+def encode_png(image):
+    """
+    Encode an image as base64 PNG data.
+    
+    Args:
+        image (Image): Image to encode.
+    
+    Returns:
+        str: Base64 encoded PNG.
+    """
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def parse_request(payload):
+    """
+    Validate a render request and fill in the defaults.
+    
+    Args:
+        payload (dict): Decoded JSON request body.
+    
+    Returns:
+        dict: Request with `lines`, `cards`, `composite`, `top` and `size`.
+    
+    Raises:
+        ValueError: If the request is malformed.
+    """
+    lines = payload.get("lines")
+    if not isinstance(lines, list) or not lines or not all(isinstance(line, str) for line in lines):
+        raise ValueError("'lines' must be a non-empty list of 'Winner Name, Character1, Character2' strings")
+    if len(lines) > MAX_LINES:
+        raise ValueError(f"'lines' must have at most {MAX_LINES} lines")
+    top = payload.get("top", main.COMPOSITE_RANKS)
+    size = payload.get("size", list(main.COMPOSITE_SIZE))
+    if not isinstance(top, int) or top < 1:
+        raise ValueError("'top' must be a positive integer")
+    if not (isinstance(size, list) and len(size) == 2 and all(isinstance(value, int) and value > 0 for value in size)):
+        raise ValueError("'size' must be [width, height]")
+    if max(size) > MAX_COMPOSITE_SIDE:
+        raise ValueError(f"'size' must be at most {MAX_COMPOSITE_SIDE} pixels wide and high")
+    return {
+        "lines": [line.strip() for line in lines],
+        "cards": bool(payload.get("cards", True)),
+        "composite": bool(payload.get("composite", True)),
+        "top": top,
+        "size": size,
+    }
+
+
+def response_key(request):
+    """
+    Build the response cache key from the request and the contents of everything it is rendered from.
+    
+    Args:
+        request (dict): Parsed render request.
+    
+    Returns:
+        str: Cache key, or None if an input is missing and the response must not be cached.
+    """
+    fingerprints = [main.card_fingerprint(line)["key"] for line in request["lines"]]
+    if None in fingerprints:
+        return None
+    return hashlib.sha1(json.dumps([request, fingerprints], sort_keys=True).encode()).hexdigest()
+
+
+def render_response(request):
+    """
+    Render the cards and the composite for a request.
+    
+    Args:
+        request (dict): Parsed render request.
+    
+    Returns:
+        dict: Base64 PNG `cards` keyed by rank, the `composite` and any `errors` keyed by rank.
+        Only `errors` is set when a line is invalid.
+    """
+    # Reject the whole request if a line is invalid, before anything is rendered
+    invalid = main.validate_ranking(request["lines"])
+    if invalid:
+        return {"errors": {str(rank): f"{type(error).__name__}: {error}" for rank, error in invalid.items()}}
+    
+    images = {}
+    cards = {}
+    errors = {}
+    count = min(request["top"], len(request["lines"])) if request["composite"] else 0
+    # Without cards in the response only the top ranks that feed the composite are rendered
+    lines = request["lines"] if request["cards"] else request["lines"][:count]
+    for rank, line in enumerate(lines, 1):
+        try:
+            image = main.render_card(rank, *main.parse_ranking_line(line))
+        except Exception as error:
+            errors[str(rank)] = f"{type(error).__name__}: {error}"
+            continue
+        # Cards are encoded right away, so only the composite's cards stay in memory as images
+        if request["cards"]:
+            cards[str(rank)] = encode_png(image)
+        if rank <= count:
+            images[rank] = image
+
+    response = {"errors": errors}
+    if request["cards"]:
+        response["cards"] = cards
+    if request["composite"]:
+        if all(rank in images for rank in range(1, count + 1)):
+            composite = main.create_composite([images[rank] for rank in range(1, count + 1)], count,
+                                              tuple(request["size"]))
+            response["composite"] = encode_png(composite)
+        else:
+            errors["composite"] = "not rendered because a card of the top ranks failed"
+    return response
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """
+    Serve `POST /render` with a JSON ranking payload and `GET /health` with cache statistics.
+    """
+
+    server_version = "RankingRenderServer/1.0"
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def send_json(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, json.dumps({"error": message}).encode())
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error_json(404, f"unknown path {self.path}")
+            return
+        self.send_json(200, json.dumps({"status": "ok", "response_cache": self.server.cache.stats()}).encode())
+
+    def do_POST(self):
+        if self.path != "/render":
+            self.send_error_json(404, f"unknown path {self.path}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = parse_request(json.loads(self.rfile.read(length)))
+        except (ValueError, AttributeError) as error:
+            self.send_error_json(400, str(error))
+            return
+
+        key = response_key(request)
+        body = self.server.cache.get(key) if key else None
+        if body is None:
+            body = json.dumps(render_response(request)).encode()
+            if key:
+                self.server.cache.put(key, body)
+        self.send_json(200, body)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def is_socket(path):
+    """
+    Check whether a path is a Unix socket, so a mistyped --socket never removes a regular file.
+    """
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def warm_up():
+    """
+    Load the fonts, logo, background layers and every character render before serving.
+    """
+    main.get_card_layers(main.fixed_width, main.fixed_height)
+    main.get_resized_logo(int(main.COMPOSITE_SIZE[0] / 2), opacity=0.8)
+    count = main.warm_render_cache(main.fixed_width, main.fixed_height)
+    print(f"Warmed {count} character renders")
+
+
+def parse_args(argv=None):
+    """
+    Parse command line options.
+    """
+    parser = argparse.ArgumentParser(description="Serve ranking cards and composites from a warm process.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default 8765).")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port.")
+    parser.add_argument("--cache-mb", type=float, default=256,
+                        help="Maximum size of the response cache in megabytes (default 256).")
+    parser.add_argument("--no-warm", action="store_true", help="Do not pre-load assets before serving.")
+    return parser.parse_args(argv)
+
+
+def serve(argv=None):
+    """
+    Run the render server until interrupted.
+    """
+    args = parse_args(argv)
+    if args.socket and os.path.lexists(args.socket) and not is_socket(args.socket):
+        print(f"{args.socket} exists and is not a socket, refusing to replace it")
+        return 1
+    if not args.no_warm:
+        warm_up()
+
+    if args.socket:
+        # A socket left behind by an earlier server that did not shut down cleanly
+        if is_socket(args.socket):
+            os.remove(args.socket)
+        server = ThreadingUnixHTTPServer(args.socket, RenderHandler)
+        address = args.socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), RenderHandler)
+        address = f"http://{args.host}:{server.server_port}"
+    server.cache = ResponseCache(int(args.cache_mb * 1024 * 1024))
+
+    print(f"Serving on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and is_socket(args.socket):
+            os.remove(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(serve())